@@ -0,0 +1,93 @@
+import re
+import hashlib
+
+# Splits article text into chunks that fit a prompt's token budget, for
+# map-reduce summarization of long reports.
+#
+# Chunks only break between paragraphs (a paragraph that is too long on its
+# own is split on sentences, then words). Besides the hard budget, a chunk
+# also ends after any paragraph whose hash hits BOUNDARY_MODULUS, once the
+# chunk is at least min_tokens long. Those content-defined boundaries mean an
+# edit only moves the chunk it lands in: later chunks keep their exact text,
+# so their cached summaries stay valid when a report is re-crawled.
+CHARS_PER_TOKEN = 4  # rough average for English with Mistral's tokenizer
+BOUNDARY_MODULUS = 4
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def paragraphs(text):
+    return [p.strip() for p in re.split(r"\n+", text or "") if p.strip()]
+
+
+def _split_long(paragraph, max_tokens):
+    # Sentence-sized pieces, falling back to word runs, all under max_tokens
+    pieces, current = [], ""
+    for sentence in SENTENCE_END.split(paragraph):
+        while estimate_tokens(sentence) > max_tokens:
+            words, head = sentence.split(" "), ""
+            for i, word in enumerate(words):
+                if head and estimate_tokens(head + " " + word) > max_tokens:
+                    sentence = " ".join(words[i:])
+                    break
+                head = f"{head} {word}" if head else word
+            else:
+                sentence = ""
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(head[:max_tokens * CHARS_PER_TOKEN])
+        if not sentence:
+            continue
+        if current and estimate_tokens(current + " " + sentence) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _is_boundary(paragraph):
+    digest = hashlib.blake2b(paragraph.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % BOUNDARY_MODULUS == 0
+
+
+def chunk_text(text, max_tokens, min_tokens=None):
+    # Returns a list of chunk strings (paragraphs joined by blank lines)
+    min_tokens = max_tokens // 3 if min_tokens is None else min_tokens
+    chunks, current, current_tokens = [], [], 0
+    for paragraph in paragraphs(text):
+        pieces = [paragraph] if estimate_tokens(paragraph) <= max_tokens else _split_long(paragraph, max_tokens)
+        for piece in pieces:
+            tokens = estimate_tokens(piece) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += tokens
+            if current_tokens >= min_tokens and _is_boundary(piece):
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def group_by_budget(texts, max_tokens):
+    # Consecutive runs of texts whose combined size fits max_tokens
+    groups, current, current_tokens = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text) + 1
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
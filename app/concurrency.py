@@ -0,0 +1,62 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+# Caps the number of simultaneous requests made to any single host.
+class HostLimiter:
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc.lower()
+        semaphore = self._semaphore(host)
+        with semaphore:
+            yield
+
+
+# Spaces calls out so that, across all threads, one starts at most every
+# `interval` seconds.
+class RateLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+# Yields fn(item) for each item using at most `workers` threads, on the
+# calling thread as results complete. With workers=1 everything runs inline
+# and in order, so the serial path is the same code as the concurrent one.
+def run_pool(fn, items, workers):
+    if workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, item) for item in items]
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                print(f"❌ Worker failed: {e}")
+                yield None
@@ -0,0 +1,56 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is used instead
+    zstandard = None
+
+# Report text is stored compressed in report.content_z, a deferred column, so
+# loading a Report for a listing or the summary card doesn't read (or
+# decompress) the article. New text is written with zstd when the zstandard
+# package is installed and zlib otherwise; blobs are told apart by their
+# magic bytes, so a DB can hold both. report.content_preview keeps the
+# truncated text /reports/<id> returns.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+PREVIEW_CHARS = 2000
+
+# SQLite function registered on every connection (app/database.py), so SQL
+# such as the search index sync can read the text: decompress_text(content_z)
+SQL_DECOMPRESS = "decompress_text"
+
+
+def compress_text(text):
+    if text is None:
+        return None
+    data = text.encode("utf-8")
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_text(blob):
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    if blob.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("report content is zstd-compressed; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(blob).decode("utf-8")
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def make_preview(text):
+    if text is None or len(text) <= PREVIEW_CHARS:
+        return text
+    return text[:PREVIEW_CHARS] + "..."
+
+
+def content_columns(text):
+    # Column values for Core inserts, which bypass the Report.content setter
+    return {"content_z": compress_text(text), "content_preview": make_preview(text)}
+
+
+def register_sqlite_functions(dbapi_connection):
+    dbapi_connection.create_function(SQL_DECOMPRESS, 1, decompress_text, deterministic=True)
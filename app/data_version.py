@@ -0,0 +1,31 @@
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+from app.database import db
+from app.models import DataVersion, Report, utcnow
+
+
+def current_data_version():
+    # (version, updated_at) — one primary-key lookup per call
+    row = db.session.get(DataVersion, 1)
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def bump_data_version(connection):
+    result = connection.execute(
+        update(DataVersion.__table__)
+        .where(DataVersion.__table__.c.id == 1)
+        .values(version=DataVersion.__table__.c.version + 1, updated_at=utcnow())
+    )
+    if result.rowcount == 0:
+        connection.execute(DataVersion.__table__.insert().values(id=1, version=1, updated_at=utcnow()))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_report_change(session, flush_context):
+    # Any ORM write touching a Report bumps the stamp in the same transaction,
+    # so the scraper, scripts and the web app all invalidate cached pages.
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, Report) for obj in changed):
+        bump_data_version(session.connection())
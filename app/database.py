@@ -1,8 +1,78 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from app.content_store import register_sqlite_functions
 
 db = SQLAlchemy()
 
+# Applied to every new SQLite connection. WAL lets the web app read while the
+# scraper writes; busy_timeout makes a blocked writer wait instead of failing
+# with "database is locked"; NORMAL sync is safe under WAL and avoids an
+# fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 10000,       # ms
+    "synchronous": "NORMAL",
+    "cache_size": -64000,        # KiB, i.e. 64 MB page cache per connection
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# The crawl frontier claims tasks with UPDATE ... RETURNING and migration 4
+# drops a column; both need SQLite 3.35 or later.
+MIN_SQLITE_VERSION = (3, 35)
+
+def check_sqlite_version():
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(
+            f"SQLite {sqlite3.sqlite_version} is too old, {'.'.join(map(str, MIN_SQLITE_VERSION))} or later "
+            f"is needed (Python's sqlite3 module is linked against it; upgrade SQLite or Python)"
+        )
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name} = {value}")
+    cursor.close()
+
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        register_sqlite_functions(dbapi_connection)
+
+# pysqlite only sends BEGIN before INSERT/UPDATE/DELETE, never before a
+# SAVEPOINT, so the RELEASE of a begin_nested() savepoint would commit
+# everything written so far. Its transaction handling is switched off and
+# SQLAlchemy's begin sends the BEGIN instead, which makes savepoints nest
+# inside one real transaction (SQLAlchemy's pysqlite savepoint recipe).
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.isolation_level = None
+
+def _begin_sqlite_transaction(conn):
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN")
+
+def vacuum():
+    # VACUUM can't run inside a transaction, so it skips SQLAlchemy's BEGIN
+    conn = db.engine.raw_connection()
+    try:
+        conn.cursor().execute("VACUUM")
+    finally:
+        conn.close()
+
 def init_db(app):
+    from app.migrations import upgrade_schema
+
     db.init_app(app)
     with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            check_sqlite_version()
+        event.listen(db.engine, "connect", _apply_sqlite_pragmas)
+        event.listen(db.engine, "connect", _register_sqlite_functions)
+        event.listen(db.engine, "connect", _disable_pysqlite_transactions)
+        event.listen(db.engine, "begin", _begin_sqlite_transaction)
+        fresh = not db.inspect(db.engine).has_table("report")
         db.create_all()
+        upgrade_schema(fresh=fresh)
@@ -0,0 +1,113 @@
+import re
+import hashlib
+from collections import Counter
+from sqlalchemy import insert, or_
+from app.database import db
+from app.models import Report, ReportFingerprint
+
+# Near-duplicate detection for syndicated reposts (esgtoday, knowesg, Google
+# News redirects ...). Texts whose 64-bit SimHashes differ in at most
+# NEAR_DUP_DISTANCE bits are treated as the same story.
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+NEAR_DUP_DISTANCE = 3
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+BACKFILL_BATCH_SIZE = 500
+
+
+def simhash(text):
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = Counter([" ".join(words)])
+    else:
+        shingles = Counter(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+    weights = [0] * SIMHASH_BITS
+    for shingle, count in shingles.items():
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+
+    result = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            result |= 1 << bit
+    return result
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def bands(h):
+    return [(h >> (i * BAND_BITS)) & BAND_MASK for i in range(SIMHASH_BITS // BAND_BITS)]
+
+
+def _to_signed(h):
+    # SQLite INTEGER is a signed 64-bit value
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def _to_unsigned(h):
+    return h + (1 << 64) if h < 0 else h
+
+
+def find_near_duplicate(h, max_distance=NEAR_DUP_DISTANCE, exclude_url=None):
+    # Returns the ReportFingerprint of a saved report close to `h`, or None.
+    # exclude_url: the URL being checked, so it never matches itself.
+    b = bands(h)
+    candidates = ReportFingerprint.query.filter(
+        ReportFingerprint.report_id.isnot(None),
+        or_(
+            ReportFingerprint.band0 == b[0],
+            ReportFingerprint.band1 == b[1],
+            ReportFingerprint.band2 == b[2],
+            ReportFingerprint.band3 == b[3],
+        ),
+    )
+    if exclude_url:
+        candidates = candidates.filter(ReportFingerprint.url != exclude_url)
+    for candidate in candidates.all():
+        if hamming_distance(h, _to_unsigned(candidate.simhash)) <= max_distance:
+            return candidate
+    return None
+
+
+def fingerprint_row(url, h, report_id=None, duplicate_of_id=None):
+    b = bands(h)
+    return dict(
+        url=url,
+        report_id=report_id,
+        duplicate_of_id=duplicate_of_id,
+        simhash=_to_signed(h),
+        band0=b[0], band1=b[1], band2=b[2], band3=b[3],
+    )
+
+
+def add_fingerprint(url, h, report_id=None, duplicate_of_id=None):
+    # A URL keeps the fingerprint it was first recorded with, so saving it
+    # again (a task retried after an interrupted run) is a no-op.
+    db.session.execute(insert(ReportFingerprint).prefix_with("OR IGNORE"),
+                       [fingerprint_row(url, h, report_id, duplicate_of_id)])
+
+
+def backfill_fingerprints(batch_size=BACKFILL_BATCH_SIZE):
+    # Fingerprint reports saved before the index existed; only rows without
+    # a fingerprint are read, so this is a no-op once caught up.
+    added = 0
+    while True:
+        reports = (
+            db.session.query(Report.id, Report.url, Report.content)
+            .outerjoin(ReportFingerprint, ReportFingerprint.report_id == Report.id)
+            .filter(ReportFingerprint.id.is_(None), Report.content_z.isnot(None))
+            .limit(batch_size)
+            .all()
+        )
+        if not reports:
+            break
+        for report_id, url, content in reports:
+            add_fingerprint(url, simhash(content), report_id=report_id)
+        db.session.commit()
+        added += len(reports)
+    return added
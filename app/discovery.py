@@ -0,0 +1,167 @@
+import re
+import json
+import base64
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from app.database import db
+from app.models import SearchQuery, utcnow
+from app.concurrency import RateLimiter, run_pool
+from app.metrics import metrics
+
+# Search-based URL discovery. Queries run concurrently but are spaced out
+# by a shared rate limiter, and results are kept in the search_query table
+# for SEARCH_TTL, so a run shortly after another reuses its results instead
+# of searching again (and getting rate limited).
+SEARCH_TTL = timedelta(hours=12)
+SEARCH_WORKERS = 3
+SEARCH_INTERVAL_SECONDS = 2.0  # between query starts, across workers
+
+search_limiter = RateLimiter(SEARCH_INTERVAL_SECONDS)
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid",
+                   "mc_cid", "mc_eid", "_ga", "_gl", "oc", "ocid", "cmpid", "smid", "mkt_tok"}
+TRACKING_PREFIXES = ("utm_", "hsa_", "pk_")
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+# google.com, its country domains (google.de, google.co.uk, google.com.au)
+# and their subdomains; nothing else is unwrapped as a Google redirect
+GOOGLE_HOST = re.compile(r"(?:[a-z0-9-]+\.)*google\.(?:com|com\.[a-z]{2}|co\.[a-z]{2}|[a-z]{2})")
+
+
+def _decode_google_news(article_id):
+    # Older news.google.com/rss/articles/<id> links are a base64 protobuf
+    # whose first string field starting with http is the article URL. Newer
+    # ids are opaque and are kept as they are.
+    try:
+        raw = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except ValueError:
+        return None
+    pos = 0
+    while pos < len(raw):
+        tag, pos = _varint(raw, pos)
+        if tag is None:
+            return None
+        wire_type = tag & 7
+        if wire_type == 0:
+            _, pos = _varint(raw, pos)
+        elif wire_type == 2:
+            length, pos = _varint(raw, pos)
+            if length is None:
+                return None
+            value = raw[pos:pos + length]
+            pos += length
+            if value.startswith((b"http://", b"https://")):
+                return value.decode("utf-8", "replace")
+        else:
+            return None
+    return None
+
+
+def _varint(raw, pos):
+    value = shift = 0
+    while pos < len(raw):
+        byte = raw[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    return None, pos
+
+
+def _unwrap_redirect(parts):
+    # Target of a Google redirect link, or None
+    host = (parts.hostname or "").lower()
+    if GOOGLE_HOST.fullmatch(host):
+        if parts.path in ("/url", "/articles") or host.startswith("news."):
+            params = dict(parse_qsl(parts.query))
+            target = params.get("q") or params.get("url")
+            if target and target.startswith(("http://", "https://")):
+                return target
+        if host.startswith("news.") and "/articles/" in parts.path:
+            return _decode_google_news(parts.path.rstrip("/").rsplit("/", 1)[-1])
+    return None
+
+
+def normalize_url(url):
+    # One spelling per article: Google redirects resolved, scheme and host
+    # lowercased, default port, fragment and tracking parameters dropped.
+    # The host is otherwise left alone (www. is not stripped: not every site
+    # answers on both names).
+    url = (url or "").strip()
+    for _ in range(3):  # redirect links can be nested
+        target = _unwrap_redirect(urlsplit(url))
+        if not target:
+            break
+        url = target
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+    host = parts.hostname.rstrip(".")
+    if parts.port and str(parts.port) != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parts.port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)]
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query, doseq=True), ""))
+
+
+def google_search(query, num_results):
+    from googlesearch import search
+    with metrics.span("discovery"):
+        return list(search(query, num_results=num_results))
+
+
+def save_search_results(results):
+    # Runs on the writer thread: {query: {column: value}}
+    rows = {row.query_text: row for row in SearchQuery.query.filter(SearchQuery.query_text.in_(list(results)))}
+    for query, fields in results.items():
+        row = rows.get(query)
+        if row is None:
+            row = SearchQuery(query_text=query)
+            db.session.add(row)
+        for name, value in fields.items():
+            setattr(row, name, value)
+    db.session.commit()
+
+
+def discover_urls(queries, num_results, writer, search=google_search, workers=None):
+    # Normalized, de-duplicated result URLs for all queries, in query order.
+    # Fresh cached results are used as they are; the other queries are
+    # searched concurrently and saved through the writer queue. A query
+    # whose search fails falls back to its stale results, if any.
+    now = utcnow()
+    cached = {row.query_text: row for row in SearchQuery.query.filter(SearchQuery.query_text.in_(list(queries)))}
+    results, due = {}, []
+    for query in queries:
+        row = cached.get(query)
+        if row and row.searched_at > now - SEARCH_TTL and row.num_results >= num_results:
+            results[query] = json.loads(row.urls)[:num_results]
+            metrics.inc("search_cache_lookups", result="hit")
+        else:
+            due.append(query)
+            metrics.inc("search_cache_lookups", result="miss")
+    if due:
+        print(f"🔎 Searching {len(due)} queries ({len(queries) - len(due)} served from the search cache)...")
+
+    def run(query):
+        search_limiter.wait()
+        try:
+            return query, search(query, num_results)
+        except Exception as e:
+            metrics.inc("discovery_errors")
+            print(f"❌ Search failed for {query!r}: {e}")
+            return query, None
+
+    fresh = {}
+    for query, urls in run_pool(run, due, workers or SEARCH_WORKERS):
+        if urls is None:
+            if query in cached:
+                results[query] = json.loads(cached[query].urls)[:num_results]
+            continue
+        results[query] = urls
+        fresh[query] = {"num_results": num_results, "urls": json.dumps(urls), "searched_at": now}
+    if fresh:
+        writer.submit(save_search_results, fresh)
+
+    return list(dict.fromkeys(normalize_url(url) for query in queries for url in results.get(query, [])))
@@ -0,0 +1,120 @@
+import os
+import importlib.util
+from collections import namedtuple
+from urllib.parse import urljoin, urlparse
+from bs4 import BeautifulSoup
+from app.http_client import get_session
+from app.metrics import metrics
+
+# lxml is several times faster than the pure-Python parser; fall back
+# quietly if it isn't installed.
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+LAZY_SRC_ATTRS = ("data-src", "data-lazy-src", "data-original")
+SRCSET_ATTRS = ("srcset", "data-srcset", "data-lazy-srcset")
+
+ImageCandidate = namedtuple("ImageCandidate", "page_number url width height")
+MIN_PARAGRAPH_LENGTH = 40
+
+
+# One fetched + parsed article page. Text, site name and image candidates
+# are all collected in a single walk over the tree so the page is never
+# downloaded or parsed twice.
+class ParsedDocument:
+    def __init__(self, url, html):
+        self.url = url
+        self.html = html
+        self.paragraphs = []
+        self.og_site_name = None
+        self.author = None
+        self.title = None
+        self.images = []  # (position among <img> tags, 1-based; tag)
+
+        soup = BeautifulSoup(html or b"", HTML_PARSER)
+        img_index = 0
+        for tag in soup.find_all(["p", "meta", "title", "img"]):
+            if tag.name == "p":
+                text = tag.text.strip()
+                if len(text) > MIN_PARAGRAPH_LENGTH:
+                    self.paragraphs.append(text)
+            elif tag.name == "meta":
+                if self.og_site_name is None and tag.get("property") == "og:site_name" and tag.get("content"):
+                    self.og_site_name = tag["content"].strip()
+                elif self.author is None and tag.get("name") == "author" and tag.get("content"):
+                    self.author = tag["content"].strip()
+            elif tag.name == "title":
+                if self.title is None and tag.string:
+                    self.title = tag.string.strip()
+            else:
+                img_index += 1
+                self.images.append((img_index, tag))
+
+    @property
+    def text(self):
+        return "\n".join(self.paragraphs)
+
+    @property
+    def site_name(self):
+        if self.og_site_name:
+            return self.og_site_name
+        if self.author:
+            return self.author
+        if self.title:
+            if "-" in self.title: return self.title.split("-")[-1].strip()
+            if "|" in self.title: return self.title.split("|")[-1].strip()
+            return self.title
+        return urlparse(self.url).netloc.replace("www.", "").split(".")[0].capitalize()
+
+    @property
+    def image_candidates(self):
+        # One candidate per <img>, in page order, resolved to an absolute URL.
+        # Lazy-load attributes and the largest srcset entry win over a
+        # placeholder src; URLs without an extension are kept and left to the
+        # Content-Type check at download time.
+        candidates = []
+        seen = set()
+        for page_number, tag in self.images:
+            src = best_srcset_url(next((tag.get(a) for a in SRCSET_ATTRS if tag.get(a)), ""))
+            src = src or next((tag.get(a) for a in LAZY_SRC_ATTRS if tag.get(a)), None) or tag.get("src")
+            if not src or src.startswith("data:"):
+                continue
+            url = urljoin(self.url, src.strip())
+            extension = os.path.splitext(urlparse(url).path)[1].lower()
+            if extension and extension not in IMAGE_EXTENSIONS:
+                continue
+            if url in seen:
+                continue
+            seen.add(url)
+            candidates.append(ImageCandidate(page_number, url, _int_attr(tag, "width"), _int_attr(tag, "height")))
+        return candidates
+
+
+def best_srcset_url(srcset):
+    # "a.jpg 480w, b.jpg 1080w" / "a.jpg 1x, b.jpg 2x" -> largest entry
+    best, best_size = None, -1.0
+    for entry in srcset.split(","):
+        parts = entry.strip().split()
+        if not parts:
+            continue
+        size = 1.0
+        if len(parts) > 1 and parts[1][:-1].replace(".", "", 1).isdigit():
+            size = float(parts[1][:-1])
+        if size > best_size:
+            best, best_size = parts[0], size
+    return best
+
+
+def _int_attr(tag, name):
+    value = (tag.get(name) or "").strip().lower().removesuffix("px")
+    return int(value) if value.isdigit() else None
+
+
+def fetch_document(url, headers=None, timeout=30):
+    with metrics.span("fetch"):
+        response = get_session().get(url, headers=headers, timeout=timeout)
+        response.raise_for_status()
+        content = response.content
+    metrics.inc("page_bytes", len(content))
+    with metrics.span("parse"):
+        return ParsedDocument(url, content)
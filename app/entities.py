@@ -0,0 +1,82 @@
+import re
+import time
+from collections import defaultdict
+from app.metrics import metrics
+
+# Company attribution from spaCy ORG entities. Articles go through nlp.pipe
+# in batches with every pipeline component NER doesn't need disabled (the
+# tagger, parser, lemmatizer ... are most of en_core_web_sm's run time).
+# n_process > 1 spreads a batch over worker processes; each pipe() call
+# starts its own workers and loads the model in each, so that only pays off
+# for batches of a few hundred documents or more. The scraper switches
+# multiprocessing to "spawn" for that, as the pipe() runs on a frontier thread.
+NER_BATCH_SIZE = 32
+NER_PROCESSES = 1
+MAX_NER_CHARS = 20000  # the lead of an article names the companies it covers
+LEAD_CHARS = 1500  # mentions this early count double
+MAX_COMPANIES = 5
+
+CORPORATE_SUFFIX = re.compile(
+    r"[,.]?\s+(inc|incorporated|corp|corporation|co|company|ltd|limited|llc|plc|ag|sa|nv|gmbh|group|holdings)\.?$",
+    re.IGNORECASE)
+# ORG entities that are almost never the company an article covers
+IGNORED_ORGS = {"esg", "iaq", "hvac", "iot", "ai", "aiot", "co2", "epa", "un", "eu", "sec", "ceo", "cfo",
+                "reuters", "bloomberg", "associated press", "ap", "getty images", "linkedin", "twitter",
+                "facebook", "instagram", "youtube", "google news"}
+
+
+def ner_pipes(nlp):
+    # NER plus the shared tok2vec/transformer only if NER listens to it
+    keep = {"ner"}
+    for name in ("tok2vec", "transformer"):
+        if name in nlp.pipe_names and "ner" in getattr(nlp.get_pipe(name), "listening_components", []):
+            keep.add(name)
+    return [name for name in nlp.pipe_names if name not in keep]
+
+
+def org_key(name):
+    # "The Boeing Company" / "Boeing Co." / "Boeing's" -> "boeing"
+    name = re.sub(r"\s+", " ", name).strip(" \"'“”‘’()-–,.")
+    name = re.sub(r"^the\s+", "", name, flags=re.IGNORECASE)
+    name = re.sub(r"['’]s$", "", name)
+    while True:
+        stripped = CORPORATE_SUFFIX.sub("", name)
+        if stripped == name or not stripped:
+            break
+        name = stripped
+    return name.lower()
+
+
+def rank_organizations(doc, exclude=(), limit=MAX_COMPANIES):
+    # ORG entities by mention count, lead mentions weighted double; each
+    # company is reported under its most frequent spelling. Names in
+    # `exclude` (e.g. the publisher) are left out.
+    excluded = {org_key(name) for name in exclude if name}
+    scores = defaultdict(float)
+    spellings = defaultdict(lambda: defaultdict(int))
+    first_seen = {}
+    for ent in doc.ents:
+        if ent.label_ != "ORG":
+            continue
+        text = re.sub(r"\s+", " ", ent.text).strip(" \"'“”‘’()-–,.")
+        key = org_key(text)
+        if len(key) < 2 or key in excluded or key in IGNORED_ORGS or not any(c.isalpha() for c in key):
+            continue
+        scores[key] += 2.0 if ent.start_char < LEAD_CHARS else 1.0
+        spellings[key][re.sub(r"['’]s$", "", text)] += 1
+        first_seen.setdefault(key, ent.start_char)
+    ranked = sorted(scores, key=lambda key: (-scores[key], first_seen[key]))
+    return [max(spellings[key].items(), key=lambda item: (item[1], -len(item[0])))[0] for key in ranked[:limit]]
+
+
+def extract_companies(nlp, texts, exclude=None, batch_size=None, n_process=None):
+    # One ranked company list per text. exclude: per-text names to leave out.
+    texts = [(text or "")[:MAX_NER_CHARS] for text in texts]
+    exclude = exclude or [()] * len(texts)
+    started = time.perf_counter()
+    docs = nlp.pipe(texts, batch_size=batch_size or NER_BATCH_SIZE, n_process=n_process or NER_PROCESSES,
+                    disable=ner_pipes(nlp))
+    companies = [rank_organizations(doc, names) for doc, names in zip(docs, exclude)]
+    metrics.observe("ner", time.perf_counter() - started)
+    metrics.inc("ner_docs", len(texts))
+    return companies
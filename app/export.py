@@ -0,0 +1,160 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from flask import current_app, render_template
+from app.database import db
+from app.models import Report
+
+# Incremental static export of the summaries blog.
+#
+#   <out>/summaries.html          newest INDEX_SIZE summaries (what /summaries shows)
+#   <out>/archive/page-N.html     every summary, ARCHIVE_PAGE_SIZE per page
+#   <out>/images/                 gallery images referenced by the cards
+#
+# Archive pages are numbered oldest-first, so new reports only ever touch the
+# last page (or add a new one) and older pages stay byte-identical. Each card
+# and page is hashed; cards are rendered only when their report changed and
+# pages are written only when their hash changed. Rendered cards are kept in
+# <out>/.export_cache/ and hashes in <out>/.export_manifest.json.
+INDEX_SIZE = 20
+ARCHIVE_PAGE_SIZE = 50
+MANIFEST_NAME = ".export_manifest.json"
+CARD_CACHE_DIR = ".export_cache"
+CARD_FIELDS = ("id", "title", "date_of_publication", "source", "url", "summary")
+
+
+def atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _sha256(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _template_hash(*names):
+    loader = current_app.jinja_env.loader
+    return _sha256(*(loader.get_source(current_app.jinja_env, name)[0] for name in names))
+
+
+def _load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"pages": {}}
+
+
+def _gallery():
+    image_dir = os.path.join(current_app.root_path, "images")
+    return image_dir, sorted(f for f in os.listdir(image_dir) if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp")))
+
+
+def _image_for(url, images):
+    # Stable per report (unlike the live page's shuffle) so cards don't churn
+    if not images:
+        return None
+    return images[int(hashlib.sha256(url.encode("utf-8")).hexdigest(), 16) % len(images)]
+
+
+def export_site(output_dir, index_size=INDEX_SIZE, page_size=ARCHIVE_PAGE_SIZE, force=False):
+    output_dir = os.path.abspath(output_dir)
+    manifest = _load_manifest(output_dir)
+    card_template = _template_hash("_summary_card.html")
+    page_template = _template_hash("summaries.html")
+    if force or manifest.get("template") != [card_template, page_template]:
+        manifest = {"pages": {}}
+    manifest["template"] = [card_template, page_template]
+
+    image_dir, images = _gallery()
+    rows = (
+        db.session.query(*(getattr(Report, field) for field in CARD_FIELDS))
+        .filter(Report.summary.isnot(None), Report.summary != "")
+        .order_by(Report.id)
+        .all()
+    )
+
+    # Cards: render only those whose content hash isn't cached yet
+    cache_dir = os.path.join(output_dir, CARD_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    cards, rendered_cards = {}, 0
+    for row in rows:
+        image = _image_for(row.url, images)
+        card_hash = _sha256(card_template, image, *(getattr(row, field) for field in CARD_FIELDS))
+        path = os.path.join(cache_dir, f"{card_hash}.html")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                html = f.read()
+        else:
+            html = render_template("_summary_card.html", item=row, image=image, image_base="../images/")
+            atomic_write(path, html.encode("utf-8"))
+            rendered_cards += 1
+        cards[row.id] = (card_hash, html, image)
+
+    # Pages: (relative path, report ids newest first, pagination links)
+    pages = []
+    chunks = [rows[i:i + page_size] for i in range(0, len(rows), page_size)] or [[]]
+    for number, chunk in enumerate(chunks, start=1):
+        pagination = {
+            "newer": f"page-{number + 1}.html" if number < len(chunks) else "../summaries.html",
+            "older": f"page-{number - 1}.html" if number > 1 else None,
+        }
+        pages.append((f"archive/page-{number}.html", [r.id for r in reversed(chunk)], pagination, "../images/"))
+    newest = sorted(rows, key=lambda r: (r.date_of_publication or "", r.id), reverse=True)[:index_size]
+    pages.append(("summaries.html", [r.id for r in newest],
+                  {"newer": None, "older": f"archive/page-{len(chunks)}.html"}, "images/"))
+
+    written = 0
+    for relative_path, ids, pagination, image_base in pages:
+        page_hash = _sha256(page_template, image_base, json.dumps(pagination, sort_keys=True),
+                            *(cards[i][0] for i in ids))
+        target = os.path.join(output_dir, relative_path)
+        if manifest["pages"].get(relative_path) == page_hash and os.path.exists(target):
+            continue
+        # Cards are rendered with ../images/; the index lives one level up
+        page_cards = [cards[i][1].replace('src="../images/', f'src="{image_base}') for i in ids]
+        html = render_template("summaries.html", cards=page_cards, pagination=pagination)
+        atomic_write(target, html.encode("utf-8"))
+        manifest["pages"][relative_path] = page_hash
+        written += 1
+
+    # Archive pages that no longer exist (reports removed)
+    live = {path for path, *_ in pages}
+    for stale in [path for path in manifest["pages"] if path not in live]:
+        stale_path = os.path.join(output_dir, stale)
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+        del manifest["pages"][stale]
+
+    # Gallery images actually used by the cards
+    copied = 0
+    for image in {card[2] for card in cards.values() if card[2]}:
+        source, target = os.path.join(image_dir, image), os.path.join(output_dir, "images", image)
+        if not os.path.exists(target) or os.path.getsize(target) != os.path.getsize(source):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(source, target)
+            copied += 1
+
+    # Drop cached cards that no report uses any more
+    used = {f"{card[0]}.html" for card in cards.values()}
+    for name in os.listdir(cache_dir):
+        if name not in used:
+            os.remove(os.path.join(cache_dir, name))
+
+    atomic_write(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=1).encode("utf-8"))
+    return {"reports": len(rows), "cards_rendered": rendered_cards, "pages_written": written,
+            "pages_total": len(pages), "images_copied": copied}
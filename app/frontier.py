@@ -0,0 +1,279 @@
+import json
+import time
+import threading
+from collections import namedtuple
+from datetime import timedelta
+from sqlalchemy import func, insert, or_, select, update
+from app.database import db
+from app.models import CrawlTask, utcnow
+from app.concurrency import run_pool
+from app.metrics import metrics
+
+# Persistent, resumable crawl frontier. Every candidate URL is a CrawlTask
+# row that moves through the stages one at a time:
+#
+#   discovered -> fetched -> filtered -> attributed -> summarized -> titled -> imaged
+#
+# plus the terminal states "skipped" (filtered out, duplicate, gone) and
+# "failed" (MAX_ATTEMPTS used up). Each stage has its own worker loop, pool
+# size and lease, so a run that crashes or is killed picks up where it
+# stopped: the next run releases the leases the stopped one still held
+# (release_leases) and claims those tasks again. Rows are only updated on the
+# writer thread (app/writer.py).
+STATES = ("discovered", "fetched", "filtered", "attributed", "summarized", "titled", "imaged")
+DONE = STATES[-1]
+SKIPPED = "skipped"
+FAILED = "failed"
+FINISHED_STATES = (DONE, SKIPPED, FAILED)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = timedelta(seconds=15)  # before the second attempt, doubled for each one after
+CLAIM_BATCH_SIZE = 20
+IDLE_POLL_SECONDS = 0.5
+MAX_ERROR_LENGTH = 1000
+
+# Tasks in `state` are claimed for `lease`; work(task) runs on a pool of
+# `workers` threads and must not touch the DB; save(task, result) runs on the
+# writer thread and returns payload updates (None values are dropped from the
+# payload; a "report_id" key goes to its own column). Either may raise
+# SkipTask; any other exception costs the task an attempt, and the task is
+# held under a lease for retry_delay() before it is claimed again. With
+# batch=True, work gets the whole claimed batch at once and returns one
+# result per task (for work that is cheaper in bulk, like NER); if it
+# raises, every task in the batch is charged.
+Stage = namedtuple("Stage", "name state next_state work save workers lease batch", defaults=(False,))
+
+
+class SkipTask(Exception):
+    pass
+
+
+def task_dict(row):
+    return {
+        "id": row.id,
+        "url": row.url,
+        "source": row.source,
+        "published": row.published,
+        "attempts": row.attempts,
+        "report_id": row.report_id,
+        "payload": json.loads(row.payload) if row.payload else {},
+    }
+
+
+# --- Writer-thread functions: pass these to WriterQueue.submit ---
+
+def enqueue(items, source):
+    # items: (url, published) pairs. URLs already in the frontier are left
+    # alone, whatever their state.
+    now = utcnow()
+    rows = [dict(url=url, source=source, published=published, state=STATES[0], attempts=0,
+                 created_at=now, updated_at=now) for url, published in items]
+    if rows:
+        db.session.execute(insert(CrawlTask).prefix_with("OR IGNORE"), rows)
+    db.session.commit()
+
+
+def requeue(tasks, state):
+    # Puts existing work back at `state`, e.g. saved reports that never got
+    # a summary. tasks: dicts with url, source, published, report_id, payload.
+    # The payload is merged into the task's own, so what earlier stages left
+    # for later ones (e.g. the image candidates) is kept.
+    now = utcnow()
+    existing = {t.url: t for t in CrawlTask.query.filter(CrawlTask.url.in_([t["url"] for t in tasks]))}
+    for task in tasks:
+        row = existing.get(task["url"])
+        if row is None:
+            row = CrawlTask(url=task["url"], source=task["source"], created_at=now)
+            db.session.add(row)
+        row.published = task.get("published")
+        row.report_id = task.get("report_id")
+        payload = json.loads(row.payload) if row.payload else {}
+        payload.update(task.get("payload") or {})
+        row.payload = json.dumps(payload)
+        row.state = state
+        row.attempts = 0
+        row.lease_until = None
+        row.last_error = None
+        row.updated_at = now
+    db.session.commit()
+
+
+def release_leases():
+    # Called when a run starts: leases still held were taken by a run that
+    # crashed or was killed, and would otherwise keep those tasks (up to a
+    # stage's whole lease) from being claimed. Assumes one scraper at a time.
+    released = db.session.execute(
+        update(CrawlTask)
+        .where(CrawlTask.lease_until.isnot(None), CrawlTask.state.notin_(FINISHED_STATES))
+        .values(lease_until=None),
+        execution_options={"synchronize_session": False},
+    ).rowcount
+    db.session.commit()
+    return released
+
+
+def claim(state, limit, lease):
+    # Leases up to `limit` tasks in one UPDATE ... RETURNING, so two
+    # processes sharing the DB never claim the same row. Fresh tasks go
+    # before retries.
+    now = utcnow()
+    claimable = (
+        select(CrawlTask.id)
+        .where(CrawlTask.state == state, or_(CrawlTask.lease_until.is_(None), CrawlTask.lease_until < now))
+        .order_by(CrawlTask.attempts, CrawlTask.id)
+        .limit(limit)
+    )
+    rows = db.session.execute(
+        update(CrawlTask)
+        .where(CrawlTask.id.in_(claimable))
+        .values(lease_until=now + lease)
+        .returning(CrawlTask.id, CrawlTask.url, CrawlTask.source, CrawlTask.published,
+                   CrawlTask.attempts, CrawlTask.report_id, CrawlTask.payload),
+        execution_options={"synchronize_session": False},
+    ).all()
+    db.session.commit()
+    return sorted((task_dict(row) for row in rows), key=lambda task: (task["attempts"], task["id"]))
+
+
+def retry_delay(attempts):
+    # Backoff after `attempts` failures, so a short outage (Ollama restarting,
+    # a burst of 503s) doesn't use up MAX_ATTEMPTS within seconds
+    return RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def save_outcomes(stage, outcomes):
+    # outcomes: (task, result, error) for one claimed batch, saved in a
+    # single transaction. Each task's save() gets a savepoint so one bad
+    # task doesn't undo the rest of the batch.
+    now = utcnow()
+    for task, result, error in outcomes:
+        updates = {}
+        if error is None and stage.save:
+            savepoint = db.session.begin_nested()
+            try:
+                try:
+                    updates = stage.save(task, result) or {}
+                except SkipTask as e:
+                    error = e  # what save() recorded before skipping is kept
+                savepoint.commit()
+            except Exception as e:
+                # save() or the flush of what it recorded failed
+                savepoint.rollback()
+                updates, error = {}, e
+        elif error is None:
+            updates = result or {}
+
+        values = {"lease_until": None, "updated_at": now}
+        if error is None:
+            payload = dict(task["payload"])
+            if "report_id" in updates:
+                values["report_id"] = updates.pop("report_id")
+            payload.update(updates)
+            values.update(
+                state=stage.next_state,
+                attempts=0,
+                last_error=None,
+                payload=json.dumps({k: v for k, v in payload.items() if v is not None}),
+            )
+        elif isinstance(error, SkipTask):
+            values.update(state=SKIPPED, last_error=str(error)[:MAX_ERROR_LENGTH], payload=None)
+        else:
+            attempts = task["attempts"] + 1
+            values.update(attempts=attempts, last_error=f"{stage.name}: {error}"[:MAX_ERROR_LENGTH])
+            if attempts >= MAX_ATTEMPTS:
+                values["state"] = FAILED
+                metrics.inc("tasks_failed", stage=stage.name)
+                print(f"❌ {stage.name} gave up on {task['url']} after {attempts} attempts: {error}")
+            else:
+                delay = retry_delay(attempts)
+                values["lease_until"] = now + delay
+                print(f"⚠️ {stage.name} failed for {task['url']} (attempt {attempts}/{MAX_ATTEMPTS}, "
+                      f"retrying in {delay.total_seconds():g} s): {error}")
+        db.session.execute(update(CrawlTask).where(CrawlTask.id == task["id"]).values(**values),
+                           execution_options={"synchronize_session": False})
+    with metrics.span("db_commit"):
+        db.session.commit()
+
+
+def retries_pending(state):
+    # Failed tasks in `state` still waiting out their retry delay. Checked
+    # between batches, when none of the stage's own tasks are in flight.
+    return db.session.query(func.count(CrawlTask.id)).filter(
+        CrawlTask.state == state, CrawlTask.lease_until.isnot(None)).scalar()
+
+
+def state_counts():
+    return dict(db.session.query(CrawlTask.state, func.count(CrawlTask.id)).group_by(CrawlTask.state).all())
+
+
+# --- Stage loops ---
+
+def _attempt(stage, task):
+    started = time.perf_counter()
+    try:
+        outcome = task, stage.work(task) if stage.work else None, None
+    except SkipTask as e:
+        outcome = task, None, e
+    except Exception as e:
+        metrics.inc("stage_errors", stage=stage.name)
+        outcome = task, None, e
+    metrics.observe("stage", time.perf_counter() - started, stage=stage.name)
+    return outcome
+
+
+def _attempt_batch(stage, tasks):
+    started = time.perf_counter()
+    try:
+        results = stage.work(tasks)
+        outcomes = [(task, result, None) for task, result in zip(tasks, results)]
+    except Exception as e:
+        metrics.inc("stage_errors", len(tasks), stage=stage.name)
+        outcomes = [(task, None, e) for task in tasks]
+    # One observation per task, like the per-task stages
+    share = (time.perf_counter() - started) / len(tasks)
+    for _ in tasks:
+        metrics.observe("stage", share, stage=stage.name)
+    return outcomes
+
+
+def run_stage(stage, writer, upstream_done, batch_size=CLAIM_BATCH_SIZE):
+    # Works batches of tasks in stage.state until none are claimable or
+    # waiting to be retried, and the previous stage has finished. Claims and
+    # saves go through the writer queue in order, so once upstream is done an
+    # empty claim really means there is nothing left for this stage.
+    processed = 0
+    while True:
+        upstream_finished = upstream_done()
+        tasks = writer.submit(claim, stage.state, batch_size, stage.lease).result()
+        if not tasks:
+            if upstream_finished and not writer.submit(retries_pending, stage.state).result():
+                return processed
+            time.sleep(IDLE_POLL_SECONDS)
+            continue
+        if stage.batch:
+            outcomes = _attempt_batch(stage, tasks)
+        else:
+            outcomes = list(run_pool(lambda task: _attempt(stage, task), tasks, stage.workers))
+        writer.submit(save_outcomes, stage, outcomes).result()
+        processed += len(outcomes)
+
+
+def run_frontier(stages, writer, batch_size=CLAIM_BATCH_SIZE):
+    # One thread per stage, all running at once; returns tasks handled per stage
+    finished = [threading.Event() for _ in stages]
+    processed = {}
+
+    def loop(index, stage):
+        upstream = (lambda: finished[index - 1].is_set()) if index else (lambda: True)
+        try:
+            processed[stage.name] = run_stage(stage, writer, upstream, batch_size)
+        finally:
+            finished[index].set()
+
+    threads = [threading.Thread(target=loop, args=(i, stage), name=f"frontier-{stage.name}", daemon=True)
+               for i, stage in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return processed
@@ -0,0 +1,123 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+from app.metrics import metrics
+
+# Shared outbound HTTP client. One keep-alive session is used for every page,
+# image, feed and Ollama request so TCP/TLS setup is paid once per host.
+POOL_CONNECTIONS = 20      # number of distinct hosts kept in the pool
+POOL_MAXSIZE = 10          # keep-alive connections per host
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5       # sleeps 0.5s, 1s, 2s ... between retries
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+        metrics.inc("http_requests")
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+        metrics.inc("http_new_connections")
+
+    @property
+    def reused(self):
+        return max(0, self.requests - self.new_connections)
+
+    def reuse_ratio(self):
+        return self.reused / self.requests if self.requests else 0.0
+
+    def summary(self):
+        return (f"{self.requests} requests, {self.new_connections} new connections "
+                f"({self.reuse_ratio():.0%} reused)")
+
+
+stats = ConnectionStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        stats.record_new_connection()
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, timeout, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        stats.record_request()
+        return super().send(request, timeout=timeout or self.timeout, **kwargs)
+
+
+def build_session(pool_maxsize=POOL_MAXSIZE, connect_timeout=CONNECT_TIMEOUT,
+                  read_timeout=READ_TIMEOUT, max_retries=MAX_RETRIES):
+    retry = Retry(
+        total=max_retries,
+        connect=1,
+        read=0,
+        status_forcelist=RETRY_STATUSES,
+        backoff_factor=BACKOFF_FACTOR,
+        allowed_methods=None,          # Ollama answers busy with 503 on POST
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = PooledAdapter(
+        timeout=(connect_timeout, read_timeout),
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def configure_session(**kwargs):
+    # Replace the shared session, e.g. to size the pool for --workers.
+    global _session
+    with _session_lock:
+        old, _session = _session, build_session(**kwargs)
+    if old is not None:
+        old.close()
+    return _session
@@ -0,0 +1,139 @@
+import struct
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from app.http_client import get_session
+from app.image_store import normalize_content_type, store_image_bytes
+from app.metrics import metrics
+
+# Image harvesting limits. Downloads are streamed: the Content-Type and the
+# dimensions in the file header are checked before the body is read, and the
+# transfer is abandoned as soon as it is clearly not a useful picture.
+MAX_CANDIDATES_PER_PAGE = 40
+IMAGE_WORKERS_PER_PAGE = 4
+MAX_IMAGES_PER_ARTICLE = 5
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+MIN_IMAGE_SIDE = 120          # rejects tracking pixels, icons, avatars
+MAX_IMAGE_SIDE = 10000
+HEADER_PROBE_BYTES = 64 * 1024
+ALLOWED_CONTENT_TYPES = ("image/png", "image/jpeg", "image/jpg", "image/webp")
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_dimensions(header):
+    # (width, height) from the first bytes of a PNG, GIF, JPEG or WebP file,
+    # or None if the header is incomplete or not recognised.
+    if header[:8] == b"\x89PNG\r\n\x1a\n" and len(header) >= 24:
+        return struct.unpack(">II", header[16:24])
+    if header[:6] in (b"GIF87a", b"GIF89a") and len(header) >= 10:
+        return struct.unpack("<HH", header[6:10])
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP" and len(header) >= 30:
+        chunk = header[12:16]
+        if chunk == b"VP8 ":
+            w, h = struct.unpack("<HH", header[26:30])
+            return w & 0x3FFF, h & 0x3FFF
+        if chunk == b"VP8L":
+            bits = int.from_bytes(header[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(header[24:27], "little") + 1, int.from_bytes(header[27:30], "little") + 1
+        return None
+    if header[:2] == b"\xff\xd8":
+        i = 2
+        while i + 9 <= len(header):
+            if header[i] != 0xFF:
+                i += 1
+                continue
+            marker = header[i + 1]
+            if marker in JPEG_SOF_MARKERS:
+                h, w = struct.unpack(">HH", header[i + 5:i + 9])
+                return w, h
+            if marker == 0xFF or 0xD0 <= marker <= 0xD9:
+                i += 1 if marker == 0xFF else 2
+                continue
+            i += 2 + struct.unpack(">H", header[i + 2:i + 4])[0]
+    return None
+
+
+def acceptable_size(width, height):
+    return (MIN_IMAGE_SIDE <= width <= MAX_IMAGE_SIDE and
+            MIN_IMAGE_SIDE <= height <= MAX_IMAGE_SIDE)
+
+
+def download_image(candidate, limiter=None, timeout=10):
+    # Returns an image dict with the downloaded bytes under "data" (not
+    # stored yet), or None if the candidate was rejected
+    if candidate.width and candidate.height and not acceptable_size(candidate.width, candidate.height):
+        return None
+
+    with limiter.slot(candidate.url) if limiter else nullcontext(), metrics.span("image_fetch"):
+        with get_session().get(candidate.url, timeout=timeout, stream=True) as response:
+            if response.status_code != 200:
+                return None
+            content_type = normalize_content_type(response.headers.get("Content-Type"), default="")
+            if content_type not in ALLOWED_CONTENT_TYPES:
+                return None
+            length = response.headers.get("Content-Length")
+            if length and length.isdigit() and int(length) > MAX_IMAGE_BYTES:
+                return None
+
+            data = bytearray()
+            dimensions = None
+            for chunk in response.iter_content(chunk_size=16 * 1024):
+                data += chunk
+                if len(data) > MAX_IMAGE_BYTES:
+                    return None
+                if dimensions is None:
+                    dimensions = image_dimensions(bytes(data[:HEADER_PROBE_BYTES]))
+                    if dimensions is None and len(data) >= HEADER_PROBE_BYTES:
+                        return None
+                    if dimensions and not acceptable_size(*dimensions):
+                        return None  # closes the connection without reading the rest
+            if dimensions is None:
+                return None
+
+    data = bytes(data)
+    metrics.inc("image_bytes", len(data))
+    return {
+        "page_number": candidate.page_number,
+        "data": data,
+        "content_type": content_type,
+        "width": dimensions[0],
+        "height": dimensions[1],
+    }
+
+
+def store_image(image):
+    # Writes a kept image to the image store; returns its ESGImage fields
+    data = image.pop("data")
+    return dict(image, sha256=store_image_bytes(data), size=len(data))
+
+
+def harvest_candidates(candidates, limiter=None, max_images=MAX_IMAGES_PER_ARTICLE,
+                       workers=IMAGE_WORKERS_PER_PAGE):
+    # ImageCandidates in page order, e.g. kept from an earlier fetch
+    candidates = candidates[:MAX_CANDIDATES_PER_PAGE]
+    if not candidates:
+        return []
+
+    def fetch(candidate):
+        try:
+            return download_image(candidate, limiter)
+        except Exception as e:
+            metrics.inc("image_errors")
+            print(f"⚠️ Failed image: {candidate.url} — {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(candidates)))) as pool:
+        images = [image for image in pool.map(fetch, candidates) if image]
+
+    # Same bytes under different URLs count once
+    unique = {}
+    for image in images:
+        unique.setdefault(hashlib.sha256(image["data"]).digest(), image)
+
+    # Keep the largest pictures; earlier on the page wins ties. Only those
+    # are written to the image store.
+    best = sorted(unique.values(), key=lambda img: (-img["width"] * img["height"], img["page_number"]))
+    return [store_image(image) for image in sorted(best[:max_images], key=lambda img: img["page_number"])]
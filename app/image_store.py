@@ -0,0 +1,41 @@
+import os
+import hashlib
+import tempfile
+
+# Content-addressed image files: each image is stored once under its sha256,
+# so a logo repeated across hundreds of articles costs one file. The DB only
+# keeps metadata (ESGImage.sha256, size, content_type).
+basedir = os.path.abspath(os.path.dirname(__file__))
+IMAGE_STORE_DIR = os.environ.get("IMAGE_STORE_DIR", os.path.join(basedir, "../instance/image_store"))
+
+
+def image_path(sha256):
+    # Two levels of fan-out keep directories small: ab/cd/abcd...
+    return os.path.join(IMAGE_STORE_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def store_image_bytes(data):
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = image_path(sha256)
+    if not os.path.exists(path):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return sha256
+
+
+def normalize_content_type(value, default="image/png"):
+    # "image/jpeg; charset=binary" -> "image/jpeg"; legacy rows store "png"
+    value = (value or "").split(";")[0].strip().lower()
+    if not value:
+        return default
+    return value if "/" in value else f"image/{value}"
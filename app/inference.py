@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.http_client import get_session
+from app.metrics import metrics
+
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+
+# Keep this in step with the server's OLLAMA_NUM_PARALLEL; anything above it
+# just queues inside Ollama instead of here.
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+
+# With stream=True the read timeout applies between chunks rather than to
+# the whole generation, so long summaries are fine as long as tokens flow.
+OLLAMA_TIMEOUT = (5, 300)
+OLLAMA_STREAM_TIMEOUT = (5, 60)
+
+
+class OllamaError(Exception):
+    pass
+
+
+def ollama_generate(prompt, model="mistral", stream=True, format=None):
+    try:
+        with metrics.span("ollama", model=model):
+            return _generate(prompt, model, stream, format)
+    except Exception:
+        metrics.inc("ollama_errors", model=model)
+        raise
+
+
+def _generate(prompt, model, stream, format):
+    payload = {"model": model, "prompt": prompt, "stream": stream}
+    if format:
+        payload["format"] = format
+    response = get_session().post(
+        f"{OLLAMA_URL}/api/generate",
+        headers={"Content-Type": "application/json"},
+        data=json.dumps(payload),
+        timeout=OLLAMA_STREAM_TIMEOUT if stream else OLLAMA_TIMEOUT,
+        stream=stream,
+    )
+    with response:
+        if response.status_code != 200:
+            raise OllamaError(f"HTTP {response.status_code}")
+        if not stream:
+            return response.json().get("response", "")
+
+        # NDJSON: one {"response": "<tokens>", "done": false} object per line
+        parts = []
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise OllamaError(chunk["error"])
+            parts.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                break
+        return "".join(parts)
+
+
+# Bounded pool for LLM work. Callers submit whole jobs (e.g. summary then
+# title for one article) and get a Future back, so fetch workers hand the
+# article over and move on instead of blocking on generation.
+class InferenceQueue:
+    def __init__(self, max_in_flight=OLLAMA_NUM_PARALLEL):
+        self._lock = threading.Lock()
+        self._pool = None
+        self.max_in_flight = max_in_flight
+
+    def resize(self, max_in_flight):
+        with self._lock:
+            old, self._pool = self._pool, None
+            self.max_in_flight = max(1, max_in_flight)
+        if old is not None:
+            old.shutdown(wait=True)
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                thread_name_prefix="ollama")
+            return self._pool
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor().submit(fn, *args, **kwargs)
+
+    def map(self, fn, items):
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+inference_queue = InferenceQueue()
@@ -0,0 +1,82 @@
+import os
+import re
+import json
+import math
+
+# Keyword lists live in app/keywords.json (or the file named by
+# KEYWORDS_FILE) so they can be tuned without touching the scraper.
+basedir = os.path.abspath(os.path.dirname(__file__))
+KEYWORDS_FILE = os.environ.get("KEYWORDS_FILE", os.path.join(basedir, "keywords.json"))
+
+TIERS = ("first", "second")
+TIER_WEIGHTS = {"first": 3.0, "second": 1.0}
+
+
+def load_keywords(path=KEYWORDS_FILE):
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    return config.get("first_priority", []), config.get("second_priority", [])
+
+
+class KeywordMatch:
+    def __init__(self):
+        self.counts = {}     # keyword -> number of hits
+        self.positions = {}  # keyword -> [character offsets]
+        self.tiers = {}      # keyword -> "first" / "second"
+        self.score = 0.0
+
+    def hits(self, tier):
+        return [kw for kw in self.counts if self.tiers[kw] == tier]
+
+    @property
+    def level(self):
+        for tier in TIERS:
+            if self.hits(tier):
+                return tier
+        return None
+
+
+# All keywords compiled into one case-insensitive alternation, longest
+# first, anchored on word boundaries so "AI" no longer matches inside
+# "said" and "IoT" not inside "patriot". One scan per document.
+class KeywordMatcher:
+    def __init__(self, first_priority, second_priority, weights=TIER_WEIGHTS):
+        self.weights = weights
+        self._order = []
+        self._lookup = {}
+        for tier, keywords in zip(TIERS, (first_priority, second_priority)):
+            for kw in keywords:
+                key = self._normalize(kw)
+                if key not in self._lookup:
+                    self._lookup[key] = (kw, tier)
+                    self._order.append(kw)
+
+        alternatives = sorted(self._lookup, key=len, reverse=True)
+        body = "|".join(r"\s+".join(re.escape(word) for word in key.split(" ")) for key in alternatives)
+        self._pattern = re.compile(rf"(?<!\w)(?:{body})(?!\w)", re.IGNORECASE) if alternatives else None
+
+    @staticmethod
+    def _normalize(text):
+        return " ".join(text.lower().split())
+
+    @classmethod
+    def from_config(cls, path=KEYWORDS_FILE):
+        return cls(*load_keywords(path))
+
+    def match(self, text):
+        result = KeywordMatch()
+        if not text or self._pattern is None:
+            return result
+        for m in self._pattern.finditer(text):
+            kw, tier = self._lookup[self._normalize(m.group(0))]
+            result.counts[kw] = result.counts.get(kw, 0) + 1
+            result.positions.setdefault(kw, []).append(m.start())
+            result.tiers[kw] = tier
+        # Keep keyword-list order so stored keyword strings stay stable
+        result.counts = {kw: result.counts[kw] for kw in self._order if kw in result.counts}
+        # Diminishing returns for repeats; first-priority terms weigh more
+        result.score = sum(self.weights[result.tiers[kw]] * (1 + math.log(n)) for kw, n in result.counts.items())
+        return result
+
+    def match_batch(self, texts):
+        return [self.match(text) for text in texts]
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# In-process timing spans and counters, cheap enough to leave on: a span is
+# two perf_counter() calls and one short locked update (a few µs). Each span
+# keeps count/sum/max plus a fixed-size reservoir sample for percentiles, so
+# memory doesn't grow with the run. /metrics renders them in Prometheus text
+# format; the scraper runs in its own process and leaves a snapshot in
+# METRICS_SNAPSHOT_PATH for the web app to serve.
+basedir = os.path.abspath(os.path.dirname(__file__))
+METRICS_SNAPSHOT_PATH = os.environ.get("SCRAPER_METRICS_PATH",
+                                       os.path.join(basedir, "../instance/scraper_metrics.json"))
+RESERVOIR_SIZE = 512
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+PREFIX = "esg"
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items())))
+
+
+class _Span:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def add(self, seconds, rng):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        # Reservoir sampling (algorithm R): every observation is equally
+        # likely to be in the sample, whatever the run length
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(seconds)
+        else:
+            slot = rng.randrange(self.count)
+            if slot < RESERVOIR_SIZE:
+                self.samples[slot] = seconds
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._spans = {}
+        self._counters = {}
+        self.started = time.time()
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            span = self._spans.get(key)
+            if span is None:
+                span = self._spans[key] = _Span()
+            span.add(seconds, self._rng)
+
+    @contextmanager
+    def span(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        # Plain JSON-able copy, also the on-disk format
+        with self._lock:
+            spans = [
+                {"name": name, "labels": dict(labels), "count": s.count, "sum": s.total, "max": s.max,
+                 "samples": list(s.samples)}
+                for (name, labels), s in self._spans.items()
+            ]
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self._counters.items()]
+        return {"started": self.started, "written": time.time(), "spans": spans, "counters": counters}
+
+    def save(self, path=METRICS_SNAPSHOT_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-metrics-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def summary_table(self):
+        return summary_table(self.snapshot())
+
+
+metrics = Metrics()
+
+
+def load_snapshot(path=METRICS_SNAPSHOT_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def quantile(samples, q):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(q * (len(samples) - 1))))]
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def _span_label(span):
+    labels = ",".join(f"{k}={v}" for k, v in sorted(span["labels"].items()))
+    return f"{span['name']}[{labels}]" if labels else span["name"]
+
+
+def summary_table(snapshot):
+    # Per-run table for the scraper's console output
+    lines = [f"{'span':34s} {'count':>7s} {'total s':>9s} {'mean ms':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'max ms':>9s}"]
+    for span in sorted(snapshot["spans"], key=lambda s: -s["sum"]):
+        mean = span["sum"] / span["count"] if span["count"] else 0.0
+        lines.append(
+            f"{_span_label(span)[:34]:34s} {span['count']:7d} {span['sum']:9.2f} {mean * 1000:9.1f} "
+            f"{quantile(span['samples'], 0.5) * 1000:9.1f} {quantile(span['samples'], 0.95) * 1000:9.1f} "
+            f"{span['max'] * 1000:9.1f}"
+        )
+    for counter in sorted(snapshot["counters"], key=lambda c: _span_label(c)):
+        lines.append(f"{_span_label(counter)[:34]:34s} {counter['value']:>7}")
+    return "\n".join(lines)
+
+
+def render_prometheus(sources):
+    # sources: (extra labels, snapshot) pairs, e.g. ({"process": "web"}, ...).
+    # Samples are grouped per metric family as the text format requires.
+    families = {}
+
+    def add(family, kind, help_text, line):
+        families.setdefault(family, (kind, help_text, []))[2].append(line)
+
+    for extra, snapshot in sources:
+        if not snapshot:
+            continue
+        for span in snapshot["spans"]:
+            labels = dict(extra, span=span["name"], **span["labels"])
+            family = f"{PREFIX}_span_seconds"
+            for q in QUANTILES:
+                add(family, "summary", "Duration of instrumented spans",
+                    f"{family}{_label_text(dict(labels, quantile=q))} {quantile(span['samples'], q):.6f}")
+            add(family, "summary", "", f"{family}_sum{_label_text(labels)} {span['sum']:.6f}")
+            add(family, "summary", "", f"{family}_count{_label_text(labels)} {span['count']}")
+            add(f"{family}_max", "gauge", "Longest observed span",
+                f"{family}_max{_label_text(labels)} {span['max']:.6f}")
+        for counter in snapshot["counters"]:
+            family = f"{PREFIX}_{counter['name']}_total"
+            add(family, "counter", counter["name"].replace("_", " ").capitalize(),
+                f"{family}{_label_text(dict(extra, **counter['labels']))} {counter['value']}")
+        add(f"{PREFIX}_metrics_start_time_seconds", "gauge", "When these metrics started accumulating",
+            f"{PREFIX}_metrics_start_time_seconds{_label_text(extra)} {snapshot['started']:.3f}")
+
+    lines = []
+    for family, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
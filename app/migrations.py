@@ -0,0 +1,119 @@
+from app.database import db
+from app.content_store import compress_text, make_preview
+from app.search import FTS_TABLE, ensure_search_index
+
+# Lightweight in-place schema upgrades for existing instance/data.db files.
+# db.create_all() only creates missing tables, so new columns and indexes on
+# existing tables are applied here instead of wiping the DB with reset_db.py.
+#
+# Each migration runs once, in order, and bumps SQLite's PRAGMA user_version.
+# Migrations must be idempotent (reset_db.py recreates tables but keeps the
+# version); a brand-new DB is stamped with the latest version.
+# Indexes declared on the models are created afterwards if missing.
+CONVERT_BATCH_SIZE = 500
+
+
+def _esg_image_external_storage(conn):
+    # SQLite can't relax NOT NULL in place, so rebuild esg_image with a
+    # nullable image_data plus the sha256/size columns of the image store.
+    if "sha256" in column_names(conn, "esg_image"):
+        return
+    conn.exec_driver_sql("""
+        CREATE TABLE esg_image_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            report_url VARCHAR(500) NOT NULL,
+            page_number INTEGER NOT NULL,
+            keyword VARCHAR(255),
+            image_data BLOB,
+            sha256 VARCHAR(64),
+            size INTEGER,
+            content_type VARCHAR(50)
+        )""")
+    conn.exec_driver_sql("""
+        INSERT INTO esg_image_new (id, report_url, page_number, keyword, image_data, size, content_type)
+        SELECT id, report_url, page_number, keyword, image_data, length(image_data), content_type
+        FROM esg_image""")
+    conn.exec_driver_sql("DROP TABLE esg_image")
+    conn.exec_driver_sql("ALTER TABLE esg_image_new RENAME TO esg_image")
+
+
+def _esg_image_dimensions(conn):
+    add_column(conn, "esg_image", "width", "INTEGER")
+    add_column(conn, "esg_image", "height", "INTEGER")
+
+
+def _report_companies(conn):
+    add_column(conn, "report", "companies", "TEXT")
+
+
+def _report_compressed_content(conn):
+    # Moves report.content into the compressed content_z column (plus the
+    # preview) and drops the old column; run VACUUM afterwards to shrink the
+    # file.
+    add_column(conn, "report", "content_z", "BLOB")
+    add_column(conn, "report", "content_preview", "TEXT")
+    if "content" not in column_names(conn, "report"):
+        return
+    last_id = 0
+    while True:
+        rows = conn.exec_driver_sql(
+            "SELECT id, content FROM report WHERE id > ? AND content IS NOT NULL ORDER BY id LIMIT ?",
+            (last_id, CONVERT_BATCH_SIZE),
+        ).all()
+        if not rows:
+            break
+        conn.exec_driver_sql(
+            "UPDATE report SET content_z = ?, content_preview = ? WHERE id = ?",
+            [(compress_text(content), make_preview(content), report_id) for report_id, content in rows],
+        )
+        last_id = rows[-1][0]
+    conn.exec_driver_sql("ALTER TABLE report DROP COLUMN content")
+
+
+def _external_content_search_index(conn):
+    # The search index kept its own copy of every report's text; it is
+    # dropped here and rebuilt by ensure_search_index() as an external-
+    # content table reading the compressed text from the report table
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+MIGRATIONS = [
+    # (version, function taking a Connection)
+    (1, _esg_image_external_storage),
+    (2, _esg_image_dimensions),
+    (3, _report_companies),
+    (4, _report_compressed_content),
+    (5, _external_content_search_index),
+]
+
+
+def column_names(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def add_column(conn, table, name, ddl):
+    if name not in column_names(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def ensure_indexes(conn):
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def upgrade_schema(fresh=False):
+    with db.engine.begin() as conn:
+        if fresh:
+            # Tables were just created from the current models
+            latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(latest)}")
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+        for target, migrate in MIGRATIONS:
+            if version < target:
+                print(f"🛠️ Migrating database schema to version {target}")
+                migrate(conn)
+                conn.exec_driver_sql(f"PRAGMA user_version = {int(target)}")
+                version = target
+        ensure_indexes(conn)
+        ensure_search_index(conn)
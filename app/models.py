@@ -1,29 +1,142 @@
+from datetime import datetime, timezone
+from sqlalchemy import func
+from sqlalchemy.ext.hybrid import hybrid_property
 from app.database import db
+from app.content_store import compress_text, decompress_text, make_preview
+
+def utcnow():
+    # Naive UTC, like the other DateTime columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 class Report(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    source = db.Column(db.String(255), nullable=False)
-    date_of_retrieval = db.Column(db.DateTime, nullable=False)
+    source = db.Column(db.String(255), nullable=False, index=True)
+    date_of_retrieval = db.Column(db.DateTime, nullable=False, index=True)
     date_of_publication = db.Column(db.String(255), nullable=True)
     url = db.Column(db.String(500), nullable=False, unique=True)
     company = db.Column(db.String(255), nullable=True)
-    content = db.Column(db.Text, nullable=True)
+    companies = db.Column(db.Text, nullable=True)  # JSON list of ORG entities, best first (app/entities.py)
+    # Article text, compressed and only loaded when .content is read (app/content_store.py)
+    content_z = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    content_preview = db.Column(db.Text, nullable=True)
     keyword = db.Column(db.String(255), nullable=True)
     content_type = db.Column(db.String(255), nullable=True)
     summary = db.Column(db.Text, nullable=True)
     title = db.Column(db.String(500), nullable=True)
 
+    __table_args__ = (
+        # Partial index backing the "latest summarized reports" queries
+        db.Index("ix_report_summarized_publication", "date_of_publication",
+                 sqlite_where=db.text("summary IS NOT NULL")),
+    )
+
+    @hybrid_property
+    def content(self):
+        return decompress_text(self.content_z)
+
+    @content.setter
+    def content(self, text):
+        self.content_z = compress_text(text)
+        self.content_preview = make_preview(text)
+
+    @content.expression
+    def content(cls):
+        # Decompressed in SQL by content_store's SQLite function, e.g.
+        # query(Report.id, Report.content)
+        return func.decompress_text(cls.content_z).label("content")
+
     def __repr__(self):
         return f"<Report {self.source} - {self.url}>"
 
 class ESGImage(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    report_url = db.Column(db.String(500), nullable=False)
+    report_url = db.Column(db.String(500), nullable=False, index=True)
     page_number = db.Column(db.Integer, nullable=False)
     keyword = db.Column(db.String(255), nullable=True)
-    image_data = db.Column(db.LargeBinary, nullable=False)  # Store image binary
+    # Legacy inline bytes; new images live in the content-addressed store
+    # (app/image_store.py) keyed by sha256. Deferred so listings never load it.
+    image_data = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    sha256 = db.Column(db.String(64), nullable=True, index=True)
+    size = db.Column(db.Integer, nullable=True)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
     content_type = db.Column(db.String(50), default="image/png")
 
     def __repr__(self):
         return f"<Image from page {self.page_number} - {self.keyword}>"
 
+
+class ReportFingerprint(db.Model):
+    # SimHash of Report.content, split into four 16-bit bands. Any two
+    # fingerprints within 3 bits of each other share at least one band, so
+    # near-duplicate lookups only touch the (indexed) band columns.
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False, unique=True)
+    report_id = db.Column(db.Integer, db.ForeignKey("report.id"), nullable=True, index=True)
+    duplicate_of_id = db.Column(db.Integer, db.ForeignKey("report.id"), nullable=True)
+    simhash = db.Column(db.BigInteger, nullable=False)
+    band0 = db.Column(db.Integer, nullable=False, index=True)
+    band1 = db.Column(db.Integer, nullable=False, index=True)
+    band2 = db.Column(db.Integer, nullable=False, index=True)
+    band3 = db.Column(db.Integer, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ReportFingerprint {self.url} - {self.simhash:#x}>"
+
+class FeedState(db.Model):
+    # Per-feed polling state: validators for conditional GETs plus the entry
+    # ids seen last time, so unchanged feeds cost a 304 and nothing else.
+    feed_url = db.Column(db.String(500), primary_key=True)
+    last_polled = db.Column(db.DateTime, nullable=True)
+    last_changed = db.Column(db.DateTime, nullable=True)
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(255), nullable=True)
+    last_entry_ids = db.Column(db.Text, nullable=True)  # JSON list, newest first
+
+    def __repr__(self):
+        return f"<FeedState {self.feed_url} - {self.last_polled}>"
+
+class SearchQuery(db.Model):
+    # Cached search results per discovery query, reused for SEARCH_TTL
+    # (app/discovery.py) so repeated runs don't hit the search engine again.
+    query_text = db.Column(db.String(500), primary_key=True)
+    num_results = db.Column(db.Integer, nullable=False)
+    urls = db.Column(db.Text, nullable=False)  # JSON list, as returned by the search
+    searched_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SearchQuery {self.query_text} - {self.searched_at}>"
+
+class DataVersion(db.Model):
+    # Single-row stamp bumped whenever reports change (see app/data_version.py);
+    # rendered pages are cached against it.
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<DataVersion {self.version} - {self.updated_at}>"
+
+class CrawlTask(db.Model):
+    # One row per URL in the crawl frontier (app/frontier.py). `state` is the
+    # last stage the URL completed; a stage claims a task by leasing it and
+    # retries it until `attempts` reaches MAX_ATTEMPTS.
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False, unique=True)
+    source = db.Column(db.String(255), nullable=False)
+    published = db.Column(db.String(255), nullable=True)
+    state = db.Column(db.String(20), nullable=False, default="discovered")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    lease_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    payload = db.Column(db.Text, nullable=True)  # JSON, output of earlier stages
+    report_id = db.Column(db.Integer, db.ForeignKey("report.id"), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_crawl_task_state_lease", "state", "lease_until"),
+    )
+
+    def __repr__(self):
+        return f"<CrawlTask {self.state} - {self.url}>"
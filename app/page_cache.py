@@ -0,0 +1,44 @@
+import os
+import threading
+
+# In-process cache of rendered pages. Entries are keyed by the data version
+# (app/data_version.py), so a write by the scraper invalidates them without
+# any explicit purge; only the newest entry per page is kept.
+class PageCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pages = {}
+
+    def get(self, name, key):
+        with self._lock:
+            entry = self._pages.get(name)
+        if entry and entry[0] == key:
+            return entry[1]
+        return None
+
+    def put(self, name, key, value):
+        with self._lock:
+            self._pages[name] = (key, value)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+page_cache = PageCache()
+
+_listing_lock = threading.Lock()
+_listings = {}
+
+
+def list_images(directory, extensions=(".png", ".jpg", ".jpeg", ".webp")):
+    # os.listdir only when the directory's mtime changes
+    mtime = os.stat(directory).st_mtime_ns
+    with _listing_lock:
+        cached = _listings.get(directory)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith(extensions))
+    with _listing_lock:
+        _listings[directory] = (mtime, files)
+    return files
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, send_file
+from flask import Blueprint, Response, jsonify, make_response, request, send_file, stream_with_context, url_for
 from app.database import db
 from app.models import ESGImage
 import io
@@ -7,6 +7,19 @@ from flask import render_template
 from collections import defaultdict
 import os
 import random
+import json
+import base64
+import binascii
+import hashlib
+import mimetypes
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, tuple_
+from app.image_store import image_path, normalize_content_type
+from app.data_version import current_data_version
+from app.page_cache import list_images, page_cache
+from app.search import search_reports
+from app.metrics import load_snapshot, metrics, render_prometheus
 from flask import current_app as app
 from flask import send_from_directory, current_app as app
 
@@ -16,17 +29,39 @@ api = Blueprint("api", __name__)
 def home():
     return jsonify({"message": "Welcome to ESG AIoT Crawler API!"})
 
+# Images are immutable once stored (content-addressed), so browsers and
+# proxies may cache them for a long time and revalidate with the sha256 ETag.
+IMAGE_MAX_AGE = 30 * 24 * 3600
+
 @api.route("/image/<int:image_id>", methods=["GET"])
 def get_image(image_id):
     img = ESGImage.query.get(image_id)
     if not img:
         return jsonify({"error": "Image not found"}), 404
 
-    return send_file(
-        io.BytesIO(img.image_data),
-        mimetype=f"image/{img.content_type}",
-        download_name=f"esg_image_{image_id}.{img.content_type}"
+    mimetype = normalize_content_type(img.content_type)
+    extension = (mimetypes.guess_extension(mimetype) or ".img").lstrip(".")
+    if img.sha256 and os.path.exists(image_path(img.sha256)):
+        # Served straight from disk: Range, If-None-Match and 304s are handled
+        # by send_file, and the WSGI server can use sendfile for the body.
+        source, etag = image_path(img.sha256), img.sha256
+    elif img.image_data is not None:
+        # Not yet moved out of the DB by migrate_images.py
+        source, etag = io.BytesIO(img.image_data), hashlib.sha256(img.image_data).hexdigest()
+    else:
+        return jsonify({"error": "Image data missing"}), 404
+
+    response = send_file(
+        source,
+        mimetype=mimetype,
+        download_name=f"esg_image_{image_id}.{extension}",
+        conditional=True,
+        etag=etag,
+        max_age=IMAGE_MAX_AGE,
     )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @api.route("/summary/<int:report_id>", methods=["GET"])
 def get_summary(report_id):
@@ -49,49 +84,156 @@ def get_report_details(report_id):
         "id": report.id,
         "source": report.source,
         "company": report.company,
+        "companies": json.loads(report.companies) if report.companies else [],
         "date_of_retrieval": report.date_of_retrieval.strftime("%Y-%m-%d %H:%M:%S"),
         "date_of_publication": report.date_of_publication,
         "url": report.url,
         "content_type": report.content_type,
         "keyword": report.keyword,
         "summary": report.summary,
-        "content": report.content[:2000] + "..." if report.content and len(report.content) > 2000 else report.content
+        "content": report.content_preview
     })
 
+# Listing endpoints use keyset pagination on (date_of_retrieval, id), newest
+# first: ?limit=N&after=<cursor>. The body stays a JSON array; the cursor for
+# the next page is in the X-Next-Cursor and Link headers. ?format=ndjson
+# streams every matching row (from `after`, up to `limit` if given) without
+# building the list in memory.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_FETCH_SIZE = 500
+
+def _encode_cursor(retrieved, report_id):
+    raw = f"{retrieved.isoformat()}|{report_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    retrieved, report_id = raw.rsplit("|", 1)
+    return datetime.fromisoformat(retrieved), int(report_id)
+
+def _keyset_listing(query, serialize):
+    # `query` selects plain columns and must include `id` and
+    # `date_of_retrieval`; only those columns are read from SQLite.
+    stream = request.args.get("format") == "ndjson"
+    try:
+        limit = request.args.get("limit", type=int)
+        if not stream:
+            limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        elif limit is not None:
+            limit = max(1, limit)
+        after = request.args.get("after")
+        if after:
+            retrieved, report_id = _decode_cursor(after)
+            query = query.filter(tuple_(Report.date_of_retrieval, Report.id) < tuple_(retrieved, report_id))
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    query = query.order_by(Report.date_of_retrieval.desc(), Report.id.desc())
+
+    if stream:
+        if limit is not None:
+            query = query.limit(limit)
+
+        def generate():
+            for row in query.yield_per(STREAM_FETCH_SIZE):
+                yield json.dumps(serialize(row)) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response = jsonify([serialize(row) for row in rows])
+    if has_more:
+        cursor = _encode_cursor(rows[-1].date_of_retrieval, rows[-1].id)
+        response.headers["X-Next-Cursor"] = cursor
+        next_url = url_for(request.endpoint, **{**request.args.to_dict(), "after": cursor, "limit": limit})
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
 @api.route("/reports", methods=["GET"])
 def get_all_reports():
-    reports = Report.query.order_by(Report.date_of_retrieval.desc()).all()
-    return jsonify([
-        {
-            "id": report.id,
-            "source": report.source,
-            "company": report.company,
-            "date_of_retrieval": report.date_of_retrieval.strftime("%Y-%m-%d %H:%M:%S"),
-            "date_of_publication": report.date_of_publication,
-            "url": report.url,
-            "content_type": report.content_type,
-            "keyword": report.keyword,
-            "has_summary": bool(report.summary),
-        }
-        for report in reports
-    ])
+    query = db.session.query(
+        Report.id,
+        Report.source,
+        Report.company,
+        Report.date_of_retrieval,
+        Report.date_of_publication,
+        Report.url,
+        Report.content_type,
+        Report.keyword,
+        (func.coalesce(func.length(Report.summary), 0) > 0).label("has_summary"),
+    )
+    return _keyset_listing(query, lambda report: {
+        "id": report.id,
+        "source": report.source,
+        "company": report.company,
+        "date_of_retrieval": report.date_of_retrieval.strftime("%Y-%m-%d %H:%M:%S"),
+        "date_of_publication": report.date_of_publication,
+        "url": report.url,
+        "content_type": report.content_type,
+        "keyword": report.keyword,
+        "has_summary": bool(report.has_summary),
+    })
 
 @api.route("/summaries/recent", methods=["GET"])
 def get_recent_summaries():
-    from datetime import datetime, timedelta
     cutoff = datetime.utcnow() - timedelta(days=1)
 
-    reports = Report.query.filter(Report.date_of_retrieval >= cutoff).all()
+    query = db.session.query(
+        Report.id,
+        Report.date_of_retrieval,
+        Report.source,
+        Report.date_of_publication,
+        Report.company,
+        Report.url,
+        Report.summary,
+    ).filter(
+        Report.date_of_retrieval >= cutoff,
+        Report.summary.isnot(None),
+        Report.summary != "",
+    )
+    return _keyset_listing(query, lambda r: {
+        "title": r.source,
+        "date": r.date_of_publication,
+        "company": r.company,
+        "url": r.url,
+        "summary": r.summary
+    })
+
+# Full-text search over title, summary, content, keyword and company, ranked
+# by BM25: /search?q=indoor air&source=RSS Feed&since=2025-01-01&until=...
+@api.route("/search", methods=["GET"])
+def search():
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "Missing query parameter 'q'"}), 400
 
+    since, until = request.args.get("since"), request.args.get("until")
+    try:
+        for value in (since, until):
+            if value:
+                datetime.strptime(value, "%Y-%m-%d")
+        limit = max(1, min(request.args.get("limit", 20, type=int), MAX_PAGE_SIZE))
+        offset = max(0, request.args.get("offset", 0, type=int))
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+
+    hits = search_reports(db.session, q, source=request.args.get("source"),
+                          since=since, until=until, limit=limit, offset=offset)
     return jsonify([
         {
-            "title": r.source,
-            "date": r.date_of_publication,
-            "company": r.company,
-            "url": r.url,
-            "summary": r.summary
+            "id": hit["id"],
+            "title": hit["title"],
+            "source": hit["source"],
+            "company": hit["company"],
+            "url": hit["url"],
+            "date_of_publication": hit["date_of_publication"],
+            "score": -hit["rank"],  # bm25() is lower-is-better
+            "snippet": hit["snippet"],
         }
-        for r in reports if r.summary
+        for hit in hits
     ])
 
 #Previous function to display summaries form images extrcated from the article.
@@ -106,25 +248,55 @@ def summaries():
 
     return render_template("summaries.html", summaries=reports, images_by_url=images_by_url) """
 
+@api.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    # This process's metrics plus the scraper's snapshot from its last run
+    body = render_prometheus([
+        ({"process": "web"}, metrics.snapshot()),
+        ({"process": "scraper"}, load_snapshot()),
+    ])
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
 @api.route('/iaq_gallery/<path:filename>')
 def serve_gallery_image(filename):
     return send_from_directory(os.path.join(app.root_path, 'images'), filename)
 
 # New function to display summaries from a set of images randomize for each article.
+# The rendered page is cached until the data version changes (i.e. until
+# reports are written), and served with ETag/Last-Modified for 304s.
 @api.route('/summaries')
 def summaries():
-    reports = Report.query.filter(Report.summary != None).order_by(Report.date_of_publication.desc()).limit(20).all()
-
-    # Load random images from app/images/
+    version, updated_at = current_data_version()
     image_dir = os.path.join(app.root_path, 'images')
-    image_files = [f for f in os.listdir(image_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
-    random.shuffle(image_files)
+    image_files = list_images(image_dir)
+    cache_key = (version, tuple(image_files))
+
+    page = page_cache.get("summaries", cache_key)
+    metrics.inc("page_cache_lookups", page="summaries", result="miss" if page is None else "hit")
+    if page is None:
+        started = time.perf_counter()
+        reports = Report.query.filter(Report.summary != None).order_by(Report.date_of_publication.desc()).limit(20).all()
 
-    # Assign one random image per summary
-    static_images = {}
-    for i, report in enumerate(reports):
-        static_images[report.url] = image_files[i % len(image_files)]
+        # Load random images from app/images/
+        shuffled = list(image_files)
+        random.shuffle(shuffled)
 
-    return render_template("summaries.html", summaries=reports, static_images=static_images)
+        # Assign one random image per summary
+        static_images = {}
+        for i, report in enumerate(reports):
+            static_images[report.url] = shuffled[i % len(shuffled)]
 
+        html = render_template("summaries.html", summaries=reports, static_images=static_images,
+                               image_base=url_for('api.serve_gallery_image', filename=''))
+        page = (html, hashlib.sha256(html.encode("utf-8")).hexdigest())
+        page_cache.put("summaries", cache_key, page)
+        metrics.observe("render", time.perf_counter() - started, page="summaries")
 
+    html, etag = page
+    response = make_response(html)
+    response.set_etag(etag)
+    if updated_at:
+        response.last_modified = updated_at.replace(tzinfo=timezone.utc)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True  # always revalidate; 304 when unchanged
+    return response.make_conditional(request)
@@ -1,68 +1,146 @@
 import os
 import sys
 import time
-import requests
-import spacy
-from bs4 import BeautifulSoup
-from flask import Flask
 from datetime import datetime, timedelta
 import json
 import subprocess
-from googlesearch import search
-import feedparser
-from urllib.parse import urlparse
-from app.models import ESGImage, Report
+from functools import lru_cache
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import CrawlTask, ESGImage, FeedState, Report
 from app import create_app
 from app.database import db
 import re
 import textwrap
+import threading
+import argparse
+import multiprocessing
 from datetime import datetime, timedelta, timezone
+from app.concurrency import HostLimiter, run_pool
+from app.http_client import configure_session, get_session, stats as http_stats
+from app.document import ImageCandidate, ParsedDocument, fetch_document
+from app.inference import OLLAMA_URL, OllamaError, inference_queue, ollama_generate
+from app.llm_cache import llm_cache
+from app.metrics import metrics
+from app.dedup import add_fingerprint, backfill_fingerprints, find_near_duplicate, simhash
+from app.writer import DB_BATCH_SIZE, WriterQueue, known_urls
+from app.image_harvest import harvest_candidates
+from app.keywords import KeywordMatcher, load_keywords
+from app.discovery import discover_urls, google_search, normalize_url
+from app import entities
+from app.entities import extract_companies
+from app.chunking import chunk_text, estimate_tokens, group_by_budget
+from app.frontier import (FINISHED_STATES, SkipTask, Stage, enqueue, release_leases, requeue, run_frontier,
+                          state_counts)
+from collections import Counter
+import requests
+from sqlalchemy import func, insert, or_, select
+
+# spaCy, googlesearch and feedparser cost seconds and hundreds of MB to
+# import, so they (and the Flask app) are only loaded on first use.
+@lru_cache(maxsize=None)
+def get_nlp():
+    import spacy
+    return spacy.load("en_core_web_sm")
+
+@lru_cache(maxsize=None)
+def get_ner():
+    # The crawl doesn't need the model: without it reports keep the site name
+    try:
+        return get_nlp()
+    except (ImportError, OSError) as e:
+        print(f"⚠️ spaCy model not available, company attribution is off: {e}")
+        return None
 
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+@lru_cache(maxsize=None)
+def get_app():
+    return create_app()
 
-nlp = spacy.load("en_core_web_sm")
-app = create_app()
+def __getattr__(name):
+    # Keeps `from app.scraper import app, nlp` working without eager loading
+    if name == "nlp":
+        return get_nlp()
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 LOOKBACK_DAYS = 0
 
+# Feeds are re-polled at most this often; each poll is a conditional GET
+FEED_POLL_INTERVAL = timedelta(hours=1)
+MAX_SEEN_ENTRY_IDS = 500
+
+# Concurrency: MAX_WORKERS articles are processed at once (1 = serial),
+# with at most PER_HOST_LIMIT simultaneous requests to any single host.
+MAX_WORKERS = 1
+PER_HOST_LIMIT = 2
+
+host_limiter = HostLimiter(PER_HOST_LIMIT)
+
+# Ask Ollama for summary and title in one JSON response instead of two calls
+COMBINED_SUMMARY_TITLE = False
+
+# Bump when a prompt below changes so cached LLM output is not reused
+SUMMARY_PROMPT_VERSION = 1
+TITLE_PROMPT_VERSION = 1
+COMBINED_PROMPT_VERSION = 1
+CHUNK_PROMPT_VERSION = 1
+MERGE_PROMPT_VERSION = 1
+
+# Reports longer than SUMMARY_CHUNK_TOKENS are summarized map-reduce style:
+# every chunk (app/chunking.py) gets a short summary of its own, in parallel,
+# and those are merged until they fit one final summary prompt. Chunk
+# summaries are cached, so a re-crawled report with a small edit only
+# re-summarizes the chunk that changed. 1500 tokens keeps each prompt well
+# inside Mistral's context window.
+SUMMARY_CHUNK_TOKENS = 1500
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.5",
     "Referer": "https://www.google.com/",
 }
 
-FIRST_PRIORITY_KEYWORDS = [
-    "indoor air quality", 
-    "internet of things and air", 
-    "AIoT air monitoring",
-    "environmental sensors for air quality"
+RSS_FEEDS = [
+    "https://news.google.com/rss/search?q=ESG+air+quality",
+    "https://www.environmentalleader.com/feed/",
+    "https://cleantechnica.com/feed/",
+    "https://esgtoday.com/feed",
+    "https://knowesg.com/rss.xml",
+    "https://esgpro.co.uk/feed",
+    "https://advanceesg.org/feed",
+    "https://www.esginvestor.net/feed",
+    "https://airqualitynews.com/feed",
+    "https://www.sciencedaily.com/rss/earth_climate/air_quality.xml",
+    "https://smartairfilters.com/en/feed",
+    "https://www.epa.gov/indoorairplus/indoor-airplus-mobile-app-rss-podcast-feed-xml-file",
+    "https://www.greenbuildermedia.com/healthy-homes-indoor-air-quality-subscription-page"
 ]
 
-SECOND_PRIORITY_KEYWORDS = [
-    "IoT", "air quality", "AI", "AIoT", "emissions", 
-    "smart devices", "HVAC", "environmental monitoring", 
-    "sustainability", "ESG", "carbon footprint"
-]
+FIRST_PRIORITY_KEYWORDS, SECOND_PRIORITY_KEYWORDS = load_keywords()
+keyword_matcher = KeywordMatcher(FIRST_PRIORITY_KEYWORDS, SECOND_PRIORITY_KEYWORDS)
 
 def match_priority_keywords(text):
-    text_lower = text.lower()
-    first_hits = [kw for kw in FIRST_PRIORITY_KEYWORDS if kw.lower() in text_lower]
-    if first_hits:
-        return first_hits, "first"
-    second_hits = [kw for kw in SECOND_PRIORITY_KEYWORDS if kw.lower() in text_lower]
-    if second_hits:
-        return second_hits, "second"
+    with metrics.span("keywords"):
+        match = keyword_matcher.match(text)
+    if match.level:
+        return match.hits(match.level), match.level
     return [], None
 
+_ollama_start_lock = threading.Lock()
+
 def ensure_ollama_running():
-    try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=2)
-        return response.status_code == 200
-    except:
-        print("🚀 Starting Ollama server...")
-        subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        time.sleep(5)
-        return True
+    # Serialized so parallel inference workers don't each spawn a server
+    with _ollama_start_lock:
+        try:
+            response = get_session().get(f"{OLLAMA_URL}/api/tags", timeout=2)
+            return response.status_code == 200
+        except:
+            print("🚀 Starting Ollama server...")
+            subprocess.Popen(["ollama", "serve"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            time.sleep(5)
+            return True
 
 def format_summary_text(raw_summary: str) -> str:
     if not raw_summary:
@@ -108,41 +186,33 @@ def format_summary_text(raw_summary: str) -> str:
 
     return "\n".join(html_parts)
 
+# Each generate_* function below goes through llm_cache.cached(): Ollama is
+# only called (and started) on a cache miss, and empty output isn't cached.
 def generate_title_from_summary(summary, model="mistral"):
-    print("🧠 Generating title from summary...")
-    ensure_ollama_running()
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": f"""
+    def generate():
+        print("🧠 Generating title from summary...")
+        ensure_ollama_running()
+        prompt = f"""
         Based on the following ESG summary, write a concise, informative, and SEO-friendly title (10 words max).
         Do not include quotes or your own commentary.
 
         --- SUMMARY ---
         {summary}
         --- END ---
-        """,
-        "stream": False
-    }
+        """
+        return ollama_generate(prompt, model=model).strip().replace('"', '')
+
     try:
-        response = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(payload))
-        if response.status_code == 200:
-            return response.json().get("response", "").strip().replace('"', '')
-        else:
-            print(f"❌ Ollama title API error: {response.status_code}")
-            return None
+        return llm_cache.cached("title", summary, model, TITLE_PROMPT_VERSION, generate)
+    except OllamaError as e:
+        print(f"❌ Ollama title API error: {e}")
+        return None
     except Exception as e:
         print(f"❌ Ollama title connection failed: {e}")
         return None
 
 
-def generate_summary_with_ollama(content, model="mistral"):
-    print("🧠 Generating summary using Ollama...")
-    ensure_ollama_running()
-    url = "http://localhost:11434/api/generate"
-    payload = {
-        "model": model,
-        "prompt": f"""
+SUMMARY_INSTRUCTIONS = """
         You are a professional ESG analyst. Write a detailed half-page summary (at least 300 words) based on the following ESG report content.
 
         Focus on:
@@ -152,236 +222,560 @@ def generate_summary_with_ollama(content, model="mistral"):
         - Corporate sustainability goals and progress
 
         Do not ask questions or introduce yourself. Just provide a well-structured, concise but rich summary using paragraphs.
+"""
 
+def generate_summary_with_ollama(content, model="mistral"):
+    def generate():
+        print("🧠 Generating summary using Ollama...")
+        ensure_ollama_running()
+        prompt = f"""{SUMMARY_INSTRUCTIONS}
         --- BEGIN REPORT ---
         {content}
         --- END REPORT ---
-        """,
-        "stream": False
-    }
+        """
+        return ollama_generate(prompt, model=model).strip()
+
     try:
-        response = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(payload))
-        if response.status_code == 200:
-            return response.json().get("response", "").strip()
-        else:
-            print(f"❌ Ollama API error: {response.status_code}")
-            return None
+        return llm_cache.cached("summary", content, model, SUMMARY_PROMPT_VERSION, generate)
+    except OllamaError as e:
+        print(f"❌ Ollama API error: {e}")
+        return None
     except Exception as e:
         print(f"❌ Ollama connection failed: {e}")
         return None
 
+def generate_chunk_summary(chunk, model="mistral"):
+    def generate():
+        ensure_ollama_running()
+        prompt = f"""
+        Summarize this section of an ESG report in one paragraph of at most 150 words.
+        Keep concrete facts: company names, figures, targets, dates and measures taken on
+        emissions, indoor air quality, energy efficiency and HVAC. Do not introduce yourself.
+
+        --- BEGIN SECTION ---
+        {chunk}
+        --- END SECTION ---
+        """
+        return ollama_generate(prompt, model=model).strip()
+
+    try:
+        return llm_cache.cached("chunk", chunk, model, CHUNK_PROMPT_VERSION, generate) or None
+    except Exception as e:
+        print(f"❌ Ollama chunk summary failed: {e}")
+        return None
+
+def merge_chunk_summaries(notes, model="mistral"):
+    def generate():
+        ensure_ollama_running()
+        prompt = f"""
+        The following are summaries of consecutive sections of one ESG report.
+        Merge them into a single paragraph of at most 250 words, keeping the concrete facts
+        and figures. Do not introduce yourself.
+
+        --- BEGIN SECTION SUMMARIES ---
+        {notes}
+        --- END SECTION SUMMARIES ---
+        """
+        return ollama_generate(prompt, model=model).strip()
+
+    try:
+        return llm_cache.cached("merge", notes, model, MERGE_PROMPT_VERSION, generate) or None
+    except Exception as e:
+        print(f"❌ Ollama merge failed: {e}")
+        return None
+
+def condense_report(content, max_tokens=None):
+    # Map-reduce down to text that fits one summary prompt: unchanged when
+    # the report is short enough, otherwise its chunk summaries in order.
+    # Returns None if any LLM call failed. Runs the calls on inference_queue,
+    # so it must not itself be called from an inference_queue job.
+    max_tokens = max_tokens or SUMMARY_CHUNK_TOKENS
+    if estimate_tokens(content) <= max_tokens:
+        return content
+    chunks = chunk_text(content, max_tokens)
+    print(f"🧩 Summarizing {len(chunks)} chunks of a {estimate_tokens(content)}-token report...")
+    metrics.inc("summary_chunks", len(chunks))
+    notes = inference_queue.map(generate_chunk_summary, chunks)
+    while None not in notes and len(notes) > 1 and estimate_tokens("\n\n".join(notes)) > max_tokens:
+        groups = group_by_budget(notes, max_tokens)
+        if len(groups) == len(notes):
+            # Every summary fills the budget on its own: merge pairs anyway
+            groups = [notes[i:i + 2] for i in range(0, len(notes), 2)]
+        notes = inference_queue.map(merge_chunk_summaries, ["\n\n".join(group) for group in groups])
+    if None in notes:
+        return None
+    return "\n\n".join(notes)
+
+def generate_summary_and_title(content, model="mistral"):
+    def generate():
+        # Cached as {"summary", "title"} JSON; None (not cached) without a summary
+        print("🧠 Generating summary and title using Ollama...")
+        ensure_ollama_running()
+        prompt = f"""{SUMMARY_INSTRUCTIONS}
+        Also write a concise, informative, and SEO-friendly title (10 words max) for the summary.
+
+        Respond only with JSON of the form {{"summary": "...", "title": "..."}}.
+
+        --- BEGIN REPORT ---
+        {content}
+        --- END REPORT ---
+        """
+        result = json.loads(ollama_generate(prompt, model=model, format="json"))
+        summary = str(result.get("summary") or "").strip()
+        title = str(result.get("title") or "").strip().replace('"', '')
+        return json.dumps({"summary": summary, "title": title or None}) if summary else None
+
+    try:
+        cached = llm_cache.cached("summary+title", content, model, COMBINED_PROMPT_VERSION, generate)
+        if cached:
+            result = json.loads(cached)
+            return result["summary"], result["title"]
+    except OllamaError as e:
+        print(f"❌ Ollama API error: {e}")
+    except ValueError as e:
+        print(f"❌ Ollama returned invalid JSON: {e}")
+    except Exception as e:
+        print(f"❌ Ollama connection failed: {e}")
+    return None, None
+
 def discover_urls_from_keywords(keywords, num_results=5):
+    # One uncached search; run_scraper goes through discover_urls instead
     query = " ".join(keywords)
     try:
-        return list(search(query, num_results=num_results))
+        return list(dict.fromkeys(normalize_url(url) for url in google_search(query, num_results)))
     except Exception as e:
+        metrics.inc("discovery_errors")
         print(f"❌ Google search failed: {e}")
         return []
 
-def extract_text_from_url(url, timeout=30):
+def fetch_article(url, timeout=30):
     try:
-        response = requests.get(url, headers=HEADERS, timeout=timeout)
-        response.raise_for_status()
-        html = response.content
-        soup = BeautifulSoup(html, "html.parser")
-        text = "\n".join([p.text.strip() for p in soup.find_all("p") if len(p.text.strip()) > 40])
-        return text, html
+        with host_limiter.slot(url):
+            return fetch_document(url, headers=HEADERS, timeout=timeout)
     except Exception as e:
         print(f"❌ Failed to extract from {url}: {e}")
+        return None
+
+def extract_text_from_url(url, timeout=30):
+    doc = fetch_article(url, timeout=timeout)
+    if not doc:
         return None, None
+    return doc.text, doc.html
+
+def poll_feed(feed_url, etag=None, last_modified=None):
+    # Conditional GET; returns None for a 304 so unchanged feeds are free
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    with host_limiter.slot(feed_url), metrics.span("feed_poll"):
+        response = get_session().get(feed_url, headers=headers, timeout=30)
+    if response.status_code == 304:
+        metrics.inc("feeds_unchanged")
+        return None
+    response.raise_for_status()
+    metrics.inc("feed_bytes", len(response.content))
+
+    import feedparser
+    with metrics.span("feed_parse"):
+        feed = feedparser.parse(response.content)
+    return {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "entries": feed.entries,
+    }
 
-def fetch_rss_articles(feed_url, days_back=LOOKBACK_DAYS):
-    feed = feedparser.parse(feed_url)
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
+def feed_entry_id(entry):
+    return entry.get("id") or entry.get("link")
+
+def fetch_rss_articles(feed_url, days_back=LOOKBACK_DAYS, entries=None, considered=None):
+    # Entries published on the last days_back calendar days (0 = today, UTC).
+    # Ids of the dated entries that were judged, kept or too old, are appended
+    # to `considered`; undated entries are left for the next poll.
+    if entries is None:
+        polled = poll_feed(feed_url)
+        entries = polled["entries"] if polled else []
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days_back)).date()
     articles = []
-    for entry in feed.entries:
+    for entry in entries:
         if hasattr(entry, "published_parsed") and entry.published_parsed:
-            dt = datetime(*entry.published_parsed[:6])
-            if dt >= cutoff:
+            # published_parsed is a UTC struct_time
+            dt = datetime(*entry.published_parsed[:6], tzinfo=timezone.utc)
+            if considered is not None:
+                considered.append(feed_entry_id(entry))
+            if dt.date() >= cutoff:
                 articles.append({"title": entry.title, "url": entry.link, "published": dt.strftime('%Y-%m-%d')})
     return articles
 
 def extract_company_name_from_url(html, url):
     if not html:
         return "General"
-    soup = BeautifulSoup(html, "html.parser")
-    og = soup.find("meta", property="og:site_name")
-    if og and og.get("content"):
-        return og["content"].strip()
-    author = soup.find("meta", attrs={"name": "author"})
-    if author and author.get("content"):
-        return author["content"].strip()
-    if soup.title and soup.title.string:
-        title = soup.title.string.strip()
-        if "-" in title: return title.split("-")[-1].strip()
-        if "|" in title: return title.split("|")[-1].strip()
-        return title
-    return urlparse(url).netloc.replace("www.", "").split(".")[0].capitalize()
-
-def extract_and_store_images(url, keyword):
-    try:
-        response = requests.get(url, headers=HEADERS, timeout=20)
-        soup = BeautifulSoup(response.content, "html.parser")
-        img_tags = soup.find_all("img")
-        for i, img in enumerate(img_tags):
-            src = img.get("src")
-            if not src or not src.lower().endswith((".png", ".jpg", ".jpeg", ".webp")):
-                continue
-            if src.startswith("//"):
-                src = "https:" + src
-            elif src.startswith("/"):
-                base = "/".join(url.split("/")[:3])
-                src = base + src
-            try:
-                img_resp = requests.get(src, timeout=10)
-                if img_resp.status_code == 200:
-                    db.session.add(ESGImage(
-                        report_url=url,
-                        page_number=i + 1,
-                        keyword=keyword,
-                        image_data=img_resp.content,
-                        content_type=img_resp.headers.get("Content-Type", "image/png")
-                    ))
-            except Exception as e:
-                print(f"⚠️ Failed image: {src} — {e}")
-        db.session.commit()
-    except Exception as e:
-        print(f"❌ Image extraction failed: {e}")
+    doc = html if isinstance(html, ParsedDocument) else ParsedDocument(url, html)
+    return doc.site_name
+
+# RSS articles only keep a summary when there is enough text to summarize
+MIN_RSS_SUMMARY_CHARS = 1000
+
+def wants_summary(content, source):
+    return bool(content) and not (source == "RSS Feed" and len(content) <= MIN_RSS_SUMMARY_CHARS)
+
+# Crawl frontier stages (see app/frontier.py). The *_stage functions run on
+# each stage's pool and only do network, LLM or CPU work; the save_*
+# functions run on the writer thread. LLM calls go through inference_queue
+# so the summarize and title stages together stay within --ollama-parallel.
+STAGE_WORKERS = {}  # per-stage pool size overrides, e.g. {"images": 8}
+run_stats = Counter()
 
-def run_scraper():
-    with app.app_context():
-        added_count = 0
-        rss_added = 0
+def fetch_stage(task):
+    url = task["url"]
+    try:
+        with host_limiter.slot(url):
+            doc = fetch_document(url, headers=HEADERS, timeout=30)
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status and 400 <= status < 500 and status != 429:
+            raise SkipTask(f"HTTP {status}")
+        raise
+    if not doc.text:
+        raise SkipTask("no article text")
+    # Image candidates are kept so the images stage doesn't fetch the page again
+    return {"content": doc.text, "company": doc.site_name, "images": [list(c) for c in doc.image_candidates]}
+
+def filter_stage(task):
+    content = task["payload"]["content"]
+    keywords, level = match_priority_keywords(content)
+    if not keywords:
+        print(f"[❌ SKIP] No matching keywords found for: {task['url']}")
+        raise SkipTask("no matching keywords")
+    return {"keyword": ", ".join(keywords), "simhash": simhash(content)}
+
+def save_filtered(task, result):
+    # Reposts of a story already saved are recorded against the original and
+    # never reach the LLM. Reports from earlier tasks are already flushed in
+    # this session, so reposts within one run are caught as well.
+    url, h = task["url"], result["simhash"]
+    report_id = db.session.query(Report.id).filter(Report.url == url).scalar()
+    if report_id is not None:
+        # Saved by a run that stopped before the task moved on; keep that report
+        print(f"♻️ Report already saved, continuing with it: {url}")
+        add_fingerprint(url, h, report_id=report_id)
+        return {"report_id": report_id, "keyword": result["keyword"]}
+
+    original = find_near_duplicate(h, exclude_url=url)
+    if original:
+        print(f"🔁 Near-duplicate of {original.url}, skipping: {url}")
+        add_fingerprint(url, h, duplicate_of_id=original.report_id)
+        raise SkipTask(f"near-duplicate of {original.url}")
+
+    now = datetime.now(timezone.utc)
+    report = Report(
+        source=task["source"],
+        date_of_retrieval=now,
+        date_of_publication=task["published"] or now.strftime("%Y-%m-%d"),
+        url=url,
+        company=task["payload"].get("company"),
+        keyword=result["keyword"],
+        content_type="Web Article",
+        content=task["payload"]["content"],
+    )
+    db.session.add(report)
+    db.session.flush()  # assigns report.id
+    add_fingerprint(url, h, report_id=report.id)
+    run_stats[task["source"]] += 1
+    metrics.inc("reports_added", source=task["source"])
+    print(f"[✅ SAVED] {task['source']} article saved: {url}")
+    return {"report_id": report.id, "keyword": result["keyword"]}
+
+def entities_stage(tasks):
+    # Batch stage: one nlp.pipe() call for the whole claimed batch. The site
+    # name is the publisher, so it is not a candidate company.
+    nlp = get_ner()
+    if nlp is None:
+        return [{} for _ in tasks]
+    companies = extract_companies(nlp, [task["payload"].get("content") for task in tasks],
+                                  exclude=[(task["payload"].get("company"),) for task in tasks])
+    return [{"companies": names} for names in companies]
+
+def save_companies(task, result):
+    if "companies" not in result:
+        return {}
+    report = db.session.get(Report, task["report_id"])
+    if report is None:
+        raise SkipTask("report was deleted")
+    report.companies = json.dumps(result["companies"])
+    if result["companies"]:
+        report.company = result["companies"][0][:255]
+    return {}
+
+def summarize_stage(task):
+    content = task["payload"].get("content")
+    if not wants_summary(content, task["source"]):
+        return {}
+    # Chunk summaries already done are cached, so a retry only redoes the rest
+    text = condense_report(content)
+    if text is None:
+        raise RuntimeError("chunk summaries failed")
+    if COMBINED_SUMMARY_TITLE:
+        raw_summary, title = inference_queue.submit(generate_summary_and_title, text).result()
+    else:
+        raw_summary, title = inference_queue.submit(generate_summary_with_ollama, text).result(), None
+    summary = format_summary_text(raw_summary)
+    if not summary:
+        raise RuntimeError("no summary from Ollama")
+    return {"summary": summary, "title": title}
+
+def title_stage(task):
+    payload = task["payload"]
+    if payload.get("title") or not payload.get("summary"):
+        return {}
+    title = inference_queue.submit(generate_title_from_summary, payload["summary"]).result()
+    if not title:
+        raise RuntimeError("no title from Ollama")
+    return {"title": title}
+
+def save_report_fields(task, result):
+    report = db.session.get(Report, task["report_id"])
+    if report is None:
+        raise SkipTask("report was deleted")
+    for name in ("summary", "title"):
+        if result.get(name):
+            setattr(report, name, result[name])
+    return result
+
+def images_stage(task):
+    candidates = [ImageCandidate(*candidate) for candidate in task["payload"].get("images", [])]
+    return harvest_candidates(candidates, limiter=host_limiter)
+
+def save_images(task, images):
+    if images:
+        keyword = task["payload"].get("keyword")
+        db.session.execute(insert(ESGImage), [dict(report_url=task["url"], keyword=keyword, **image) for image in images])
+    # Done: drop the bulky payload fields
+    return {"content": None, "images": None, "summary": None}
+
+def crawl_stages(workers=MAX_WORKERS):
+    llm_workers = inference_queue.max_in_flight
+    stages = [
+        Stage("fetch", "discovered", "fetched", fetch_stage, None, workers, timedelta(minutes=5)),
+        Stage("filter", "fetched", "filtered", filter_stage, save_filtered, 1, timedelta(minutes=5)),
+        Stage("entities", "filtered", "attributed", entities_stage, save_companies, 1, timedelta(minutes=10), batch=True),
+        Stage("summarize", "attributed", "summarized", summarize_stage, save_report_fields, llm_workers, timedelta(minutes=30)),
+        Stage("title", "summarized", "titled", title_stage, save_report_fields, llm_workers, timedelta(minutes=10)),
+        Stage("images", "titled", "imaged", images_stage, save_images, workers, timedelta(minutes=10)),
+    ]
+    return [stage._replace(workers=max(1, STAGE_WORKERS.get(stage.name, stage.workers))) for stage in stages]
+
+def requeue_unsummarized():
+    # Runs on the writer thread. Reports saved without a summary (Ollama down,
+    # timeouts, a crash mid-run ...) go back to the summarize stage unless
+    # their task is still in progress.
+    in_progress = select(CrawlTask.url).where(CrawlTask.state.notin_(FINISHED_STATES))
+    # wants_summary() in SQL, on the preview (the text up to PREVIEW_CHARS,
+    # more than MIN_RSS_SUMMARY_CHARS) so only requeued reports are decompressed
+    length = func.length(Report.content_preview)
+    rows = (
+        db.session.query(Report.id, Report.url, Report.source, Report.date_of_publication,
+                         Report.content, Report.keyword)
+        .filter(or_(Report.summary.is_(None), Report.summary == ""), Report.url.notin_(in_progress),
+                length > 0, or_(Report.source.is_distinct_from("RSS Feed"), length > MIN_RSS_SUMMARY_CHARS))
+        .all()
+    )
+    tasks = [
+        dict(url=row.url, source=row.source, published=row.date_of_publication, report_id=row.id,
+             payload={"content": row.content, "keyword": row.keyword})
+        for row in rows
+    ]
+    if tasks:
+        requeue(tasks, "attributed")
+    return len(tasks)
+
+def save_feed_states(updates):
+    # Runs on the writer thread: {feed_url: {column: value}}
+    states = {state.feed_url: state for state in FeedState.query.filter(FeedState.feed_url.in_(list(updates)))}
+    for feed, fields in updates.items():
+        state = states.get(feed)
+        if state is None:
+            state = FeedState(feed_url=feed)
+            db.session.add(state)
+        for name, value in fields.items():
+            setattr(state, name, value)
+    db.session.commit()
+
+def run_scraper(workers=MAX_WORKERS, batch_size=DB_BATCH_SIZE, rss_feeds=None, discovered_urls=None):
+    # Discovery and feed polling only queue URLs in the crawl frontier; the
+    # stage loops then take every unfinished task (including ones left over
+    # from an interrupted run) through to the end. This thread only reads;
+    # every write goes through the writer queue.
+    # rss_feeds / discovered_urls replace RSS_FEEDS and the Google search
+    # (benchmarks/e2e.py points them at local servers). Timings for the run
+    # are printed at the end and saved for the web app's /metrics.
+    app = get_app()
+    with app.app_context(), WriterQueue(app) as writer:
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=LOOKBACK_DAYS)
+        seen = set()
+        run_stats.clear()
+        metrics.reset()
+        started = time.perf_counter()
+
+        fingerprinted = writer.submit(backfill_fingerprints).result()
+        if fingerprinted:
+            print(f"🧬 Fingerprinted {fingerprinted} existing reports for near-duplicate detection")
+        released = writer.submit(release_leases).result()
+        if released:
+            print(f"🔓 Released {released} tasks leased by an interrupted run")
+        requeued = writer.submit(requeue_unsummarized).result()
+        if requeued:
+            print(f"🔁 Re-queued {requeued} saved reports that have no summary yet")
 
         print("🌐 Discovering Google articles...")
-        discovered = []
-        for kw in FIRST_PRIORITY_KEYWORDS:
-            discovered += discover_urls_from_keywords([kw], num_results=3)
-        if len(discovered) < 5:
-            for kw in SECOND_PRIORITY_KEYWORDS:
-                discovered += discover_urls_from_keywords([kw], num_results=2)
-        discovered = list(set(discovered))
-
+        discovered = [normalize_url(url) for url in discovered_urls or []]
+        if discovered_urls is None:
+            discovered = discover_urls(FIRST_PRIORITY_KEYWORDS, 3, writer)
+            if len(discovered) < 5:
+                discovered += discover_urls(SECOND_PRIORITY_KEYWORDS, 2, writer)
+        discovered = list(dict.fromkeys(discovered))
+
+        known = known_urls(discovered)
+        google_articles = []
         for url in discovered:
-            existing = Report.query.filter_by(url=url).first()
-            if existing:
+            if url in known:
                 print(f"⏭️ Skipping Google article already in database: {url}")
                 continue
-
             print(f"\n🆕 New Google article found: {url}")
-            content, raw_html = extract_text_from_url(url)
-            if not content:
-                continue
-
-            company = extract_company_name_from_url(raw_html, url)
-            keywords, level = match_priority_keywords(content)
-            if not keywords:
-                print(f"[❌ SKIP] No matching keywords found for: {url}")
-                continue
+            seen.add(url)
+            google_articles.append((url, None))
 
-            raw_summary = generate_summary_with_ollama(content[:5000])
-            summary = format_summary_text(raw_summary)
-
-            title = generate_title_from_summary(summary) if summary else None
-
-            db.session.add(Report(
-                source="Web Article",
-                date_of_retrieval=datetime.now(timezone.utc),
-                date_of_publication=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
-                url=url,
-                company=company,
-                keyword=", ".join(keywords),
-                content_type="Web Article",
-                content=content,
-                summary=summary,
-                title=title
-            ))
-            db.session.commit()
-            added_count += 1
-
-            print(f"[✅ SAVED] Google article saved")
-            extract_and_store_images(url, ", ".join(keywords))
+        writer.submit(enqueue, google_articles, "Web Article")
 
         print("🌐 Fetching RSS feeds...")
-        rss_feeds = [
-            "https://news.google.com/rss/search?q=ESG+air+quality",
-            "https://www.environmentalleader.com/feed/",
-            "https://cleantechnica.com/feed/",
-            "https://esgtoday.com/feed",
-            "https://knowesg.com/rss.xml",
-            "https://esgpro.co.uk/feed",
-            "https://advanceesg.org/feed",
-            "https://www.esginvestor.net/feed",
-            "https://airqualitynews.com/feed",
-            "https://www.sciencedaily.com/rss/earth_climate/air_quality.xml",
-            "https://smartairfilters.com/en/feed",
-            "https://www.epa.gov/indoorairplus/indoor-airplus-mobile-app-rss-podcast-feed-xml-file",
-            "https://www.greenbuildermedia.com/healthy-homes-indoor-air-quality-subscription-page"
-        ]
-
-        rss_skip_days = 3
-        rss_cutoff = datetime.now(timezone.utc) - timedelta(days=rss_skip_days)
+        rss_feeds = RSS_FEEDS if rss_feeds is None else rss_feeds
 
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        states = {state.feed_url: state for state in FeedState.query.filter(FeedState.feed_url.in_(rss_feeds))}
+        due = []
         for feed in rss_feeds:
-            feed_domain = urlparse(feed).netloc.replace("www.", "").split("/")[0]
+            state = states.get(feed) or FeedState(feed_url=feed)
+            states[feed] = state
+            if state.last_polled and state.last_polled > now - FEED_POLL_INTERVAL:
+                print(f"⏭️ Skipping {feed} (polled at {state.last_polled:%Y-%m-%d %H:%M})")
+                continue
+            due.append((feed, state.etag, state.last_modified))
+
+        def safe_poll(item):
+            feed, etag, last_modified = item
+            try:
+                return feed, poll_feed(feed, etag, last_modified)
+            except Exception as e:
+                print(f"❌ Failed to fetch feed {feed}: {e}")
+                return feed, False
 
-            recent_articles = Report.query.filter(
-                Report.source == "RSS Feed",
-                Report.url.contains(feed_domain),
-                Report.date_of_retrieval >= rss_cutoff
-            ).first()
+        rss_candidates = []
+        feed_updates = {}
+        for feed, polled in run_pool(safe_poll, due, workers):
+            if polled is False:
+                continue
+            update = feed_updates[feed] = {"last_polled": now}
+            if polled is None:
+                print(f"⏭️ {feed} unchanged (304)")
+                continue
 
-            if recent_articles:
-                print(f"⏭️ Skipping {feed} (already used within last {rss_skip_days} days)")
+            update["etag"] = polled["etag"]
+            update["last_modified"] = polled["last_modified"]
+            seen_ids = json.loads(states[feed].last_entry_ids or "[]")
+            seen_set = set(seen_ids)
+            new_entries = [entry for entry in polled["entries"] if feed_entry_id(entry) not in seen_set]
+            if not new_entries:
+                print(f"⏭️ {feed} has no new entries")
+                continue
+            update["last_changed"] = now
+
+            # Only entries that were actually judged are remembered as seen
+            considered = []
+            rss_candidates += fetch_rss_articles(feed, days_back=LOOKBACK_DAYS, entries=new_entries,
+                                                 considered=considered)
+            kept = list(dict.fromkeys(considered + seen_ids))
+            update["last_entry_ids"] = json.dumps(kept[:MAX_SEEN_ENTRY_IDS])
+        if feed_updates:
+            writer.submit(save_feed_states, feed_updates)
+
+        known = known_urls([normalize_url(article["url"]) for article in rss_candidates])
+        rss_articles = []
+        for article in rss_candidates:
+            url = normalize_url(article["url"])
+            if url in seen or url in known:
+                print(f"⏭️ Skipping RSS article already in database: {url}")
                 continue
 
-            for article in fetch_rss_articles(feed, days_back=LOOKBACK_DAYS):
-                url = article["url"]
-                existing = Report.query.filter_by(url=url).first()
-                if existing:
-                    print(f"⏭️ Skipping RSS article already in database: {url}")
-                    continue
-
-                print(f"\n🆕 New RSS article found: {url}")
-                content, raw_html = extract_text_from_url(url)
-                if not content:
-                    continue
-
-                company = extract_company_name_from_url(raw_html, url)
-                keywords, level = match_priority_keywords(content)
-                if not keywords:
-                    print(f"❌ Skipping No matching keywords found for: {url}")
-                    continue
-
-                raw_summary = generate_summary_with_ollama(content[:5000])
-                summary = format_summary_text(raw_summary) if len(content) > 1000 else None
-                title = generate_title_from_summary(summary) if summary else None
-
-                db.session.add(Report(
-                    source="RSS Feed",
-                    date_of_retrieval=datetime.now(timezone.utc),
-                    date_of_publication=article["published"],
-                    url=url,
-                    company=company,
-                    keyword=", ".join(keywords),
-                    content_type="Web Article",
-                    content=content,
-                    summary=summary,
-                    title=title
-                ))
-                db.session.commit()
-                rss_added += 1
-
-                print(f"✅ RSS article saved")
-                extract_and_store_images(url, ", ".join(keywords))
+            print(f"\n🆕 New RSS article found: {url}")
+            seen.add(url)
+            rss_articles.append((url, article["published"]))
+
+        writer.submit(enqueue, rss_articles, "RSS Feed")
+        db.session.commit()  # end this thread's read transaction so WAL checkpoints aren't held back
+
+        processed = run_frontier(crawl_stages(workers), writer, batch_size)
+        counts = writer.submit(state_counts).result()
 
         print("✅ Web Scraping Done")
-        print(f"📊 Google → Added: {added_count}")
-        print(f"📡 RSS    → Added: {rss_added}")
+        print(f"📊 Google → Added: {run_stats['Web Article']}")
+        print(f"📡 RSS    → Added: {run_stats['RSS Feed']}")
+        print("🧭 Stages → " + ", ".join(f"{name} {count}" for name, count in processed.items()))
+        print("🗂️ Frontier → " + ", ".join(f"{state} {counts[state]}" for state in sorted(counts)))
+        print(f"🔌 HTTP   → {http_stats.summary()}")
+        print(f"💾 LLM cache → {llm_cache.summary()}")
+
+        metrics.observe("run", time.perf_counter() - started)
+        print("⏱️ Run timings")
+        print(metrics.summary_table())
+        metrics.save()
+        return {"added": dict(run_stats), "stages": processed, "frontier": counts}
 
 if __name__ == "__main__":
-    run_scraper()
+    parser = argparse.ArgumentParser(description="ESG / IAQ article scraper")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="fetch and image workers per stage (1 = serial)")
+    parser.add_argument("--per-host", type=int, default=PER_HOST_LIMIT,
+                        help="max simultaneous requests to a single host")
+    parser.add_argument("--pool-size", type=int, default=None,
+                        help="keep-alive connections kept per host (default: max of 10 and --workers)")
+    parser.add_argument("--ollama-parallel", type=int, default=inference_queue.max_in_flight,
+                        help="in-flight Ollama requests (match the server's OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--combined", action="store_true",
+                        help="get summary and title from one JSON response")
+    parser.add_argument("--chunk-tokens", type=int, default=SUMMARY_CHUNK_TOKENS,
+                        help="longer reports are summarized in chunks of about this many tokens")
+    parser.add_argument("--ner-processes", type=int, default=1,
+                        help="spaCy processes per NER batch (pays off with a large --batch-size)")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="always call Ollama, ignoring cached summaries/titles")
+    parser.add_argument("--batch-size", type=int, default=DB_BATCH_SIZE,
+                        help="frontier tasks claimed and saved per database transaction")
+    parser.add_argument("--stage-workers", default="",
+                        help="per-stage pool sizes, e.g. fetch=8,summarize=2,images=4")
+    args = parser.parse_args()
+    for item in filter(None, args.stage_workers.split(",")):
+        name, _, count = item.partition("=")
+        STAGE_WORKERS[name.strip()] = int(count)
+    llm_cache.enabled = not args.no_llm_cache
+    configure_session(pool_maxsize=args.pool_size or max(10, args.workers))
+    inference_queue.resize(args.ollama_parallel)
+    COMBINED_SUMMARY_TITLE = args.combined or COMBINED_SUMMARY_TITLE
+    SUMMARY_CHUNK_TOKENS = max(200, args.chunk_tokens)
+    entities.NER_PROCESSES = max(1, args.ner_processes)
+    if entities.NER_PROCESSES > 1:
+        # NER workers are started from a frontier thread while the other
+        # stage pools are running; forking then can copy a lock another
+        # thread holds and deadlock the child, so start them fresh instead
+        multiprocessing.set_start_method("spawn", force=True)
+    host_limiter.limit = max(1, args.per_host)
+    run_scraper(workers=max(1, args.workers), batch_size=args.batch_size)
+
+    # Re-render only the summary cards/pages that changed since last export
+    from app.export import export_site
+    with get_app().app_context():
+        export_stats = export_site(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+        print(f"📝 Export → {export_stats['cards_rendered']} cards rendered, {export_stats['pages_written']} pages written")
 # Auto-push updated summary.html to GitHub
     try:
         print("📤 Committing Changes to GitHub...")
@@ -0,0 +1,131 @@
+import re
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.models import Report
+
+# SQLite FTS5 index over reports, rowid = report.id. It is an external-
+# content table: the index doesn't keep a copy of the text, snippet() reads
+# it back through the FTS_SOURCE view (which decompresses report content,
+# see app/content_store.py). It is created/backfilled by upgrade_schema()
+# and kept in sync from the same flush hook pattern as the data version, so
+# every ORM write updates it incrementally. Writes that bypass the ORM
+# (Core inserts) must be followed by rebuild_search_index().
+FTS_TABLE = "report_fts"
+FTS_SOURCE = "report_fts_source"
+FTS_COLUMNS = ("title", "summary", "content", "keyword", "company")
+# SQL that reads each indexed column from the report table
+FTS_SOURCES = {"content": "decompress_text(content_z)"}
+# bm25() column weights, same order as FTS_COLUMNS: a title hit counts most
+BM25_WEIGHTS = (10.0, 5.0, 1.0, 3.0, 2.0)
+
+
+def _source_columns():
+    return ", ".join(f"{FTS_SOURCES.get(column, column)} AS {column}" for column in FTS_COLUMNS)
+
+
+def ensure_search_index(conn):
+    conn.exec_driver_sql(f"CREATE VIEW IF NOT EXISTS {FTS_SOURCE} AS SELECT id, {_source_columns()} FROM report")
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).first()
+    if exists:
+        return
+    print("🔎 Building full-text search index...")
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+        f"{', '.join(FTS_COLUMNS)}, content = '{FTS_SOURCE}', content_rowid = 'id', "
+        f"tokenize = 'porter unicode61')"
+    )
+    rebuild_search_index(conn)
+
+
+def rebuild_search_index(conn):
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def _index(conn, report_ids, command=None):
+    # Adds the reports' current values to the index, or with command="delete"
+    # removes them (an external-content index needs the indexed values to
+    # find the entries to remove)
+    ids = ", ".join(str(int(i)) for i in report_ids)
+    columns = ", ".join(FTS_COLUMNS)
+    if command:
+        conn.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) "
+            f"SELECT '{command}', id, {columns} FROM {FTS_SOURCE} WHERE id IN ({ids})"
+        )
+    else:
+        conn.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM {FTS_SOURCE} WHERE id IN ({ids})"
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _unindex_old_values(session, flush_context, instances):
+    # Changed and deleted reports leave the index while the report table
+    # still has the values they were indexed with
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Report) and obj.id is not None]
+    changed = [obj.id for obj in session.dirty
+               if isinstance(obj, Report) and obj.id is not None and obj.id not in deleted]
+    session.info["fts_changed"] = changed
+    if changed or deleted:
+        _index(session.connection(), changed + deleted, command="delete")
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_search_index(session, flush_context):
+    changed = [obj.id for obj in session.new if isinstance(obj, Report)] + session.info.pop("fts_changed", [])
+    if changed:
+        _index(session.connection(), changed)
+
+
+def fts_query(q):
+    # Turn free text into a safe FTS5 query: every term quoted (so stray
+    # quotes, colons or AND/OR/NEAR can't cause syntax errors) and ANDed;
+    # a trailing * keeps prefix matching ("sustain*").
+    terms = []
+    for term in re.findall(r'[^\s"]+\*?', q or ""):
+        prefix = term.endswith("*")
+        word = term.rstrip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+def search_reports(session, q, source=None, since=None, until=None, limit=20, offset=0):
+    match = fts_query(q)
+    if not match:
+        return []
+    filters = []
+    params = {"match": match, "limit": limit, "offset": offset}
+    if source:
+        filters.append("r.source = :source")
+        params["source"] = source
+    if since:
+        filters.append("r.date_of_publication >= :since")
+        params["since"] = since
+    if until:
+        filters.append("r.date_of_publication <= :until")
+        params["until"] = until
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    # Ranked first, snippets only for the page of hits: snippet() reads (and
+    # decompresses) the report text through the external-content view
+    sql = f"""
+        WITH hits AS (
+            SELECT {FTS_TABLE}.rowid AS id, bm25({FTS_TABLE}, {weights}) AS rank
+            FROM {FTS_TABLE}
+            JOIN report r ON r.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH :match {''.join(' AND ' + f for f in filters)}
+            ORDER BY rank
+            LIMIT :limit OFFSET :offset
+        )
+        SELECT r.id, r.title, r.source, r.company, r.url, r.date_of_publication, hits.rank,
+               snippet({FTS_TABLE}, -1, '<mark>', '</mark>', '…', 24) AS snippet
+        FROM hits
+        JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = hits.id
+        JOIN report r ON r.id = hits.id
+        WHERE {FTS_TABLE} MATCH :match
+        ORDER BY hits.rank
+    """
+    return session.execute(text(sql), params).mappings().all()
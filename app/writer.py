@@ -0,0 +1,90 @@
+import queue
+import threading
+from concurrent.futures import Future
+from app.database import db
+from app.models import Report, ReportFingerprint
+from app.metrics import metrics
+
+# Frontier tasks are claimed and saved DB_BATCH_SIZE at a time: one
+# transaction per batch (app/frontier.py) instead of one commit per row.
+DB_BATCH_SIZE = 20
+URL_LOOKUP_CHUNK = 500  # stays well under SQLite's bound-parameter limit
+WRITE_QUEUE_SIZE = 256   # producers block (backpressure) once this many writes are pending
+
+
+def known_urls(urls):
+    # One IN (...) query per chunk instead of a SELECT per candidate URL.
+    # Includes URLs already recorded as near-duplicates of a saved report.
+    urls = list(dict.fromkeys(urls))
+    known = set()
+    for i in range(0, len(urls), URL_LOOKUP_CHUNK):
+        chunk = urls[i:i + URL_LOOKUP_CHUNK]
+        known.update(u for (u,) in db.session.query(Report.url).filter(Report.url.in_(chunk)))
+        known.update(u for (u,) in db.session.query(ReportFingerprint.url).filter(ReportFingerprint.url.in_(chunk)))
+    return known
+
+
+# Single owner of every scraper write. One thread, with its own app context
+# and session, drains a queue of write jobs, so fetch workers and the main
+# loop never compete for SQLite's write lock (and never hold it while doing
+# network I/O). Jobs return Futures.
+class WriterQueue:
+    def __init__(self, app):
+        self.app = app
+        self.failures = 0
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    break
+                future, fn, args, kwargs = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with metrics.span("db_write", job=getattr(fn, "__name__", "job")):
+                        result = fn(*args, **kwargs)
+                    future.set_result(result)
+                except BaseException as e:
+                    db.session.rollback()
+                    self.failures += 1
+                    metrics.inc("db_write_errors")
+                    future.set_exception(e)
+            db.session.remove()
+
+    def submit(self, fn, *args, **kwargs):
+        # fn runs on the writer thread and may use db.session freely
+        if self._thread is None:
+            raise RuntimeError("WriterQueue.start() has not been called")
+        future = Future()
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def flush(self):
+        # Waits until every job queued so far has run
+        return self.submit(lambda: None).result()
+
+    def close(self):
+        if self._thread is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,211 @@
+# Database size and per-request memory before/after compressed content
+# storage (app/content_store.py, schema migration 4) and the external-content
+# search index (app/search.py, migration 5).
+#
+#   python benchmarks/content_storage.py                 # 2000 reports of ~1500 words
+#   python benchmarks/content_storage.py --reports 10000 --json content.json
+#
+# Builds a throwaway DB in the old layout (plain report.content TEXT column,
+# search index with its own copy of the text), measures it, lets create_app() run the migrations, VACUUMs and measures
+# again. Memory is the tracemalloc peak of the ORM loads behind /summary/<id>,
+# /reports/<id> and /summaries, with the old mapping (content loaded with
+# every row) against the current Report model.
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+VOCABULARY = ("air quality indoor sensor emissions carbon hvac ventilation filter co2 radon building "
+              "energy esg report climate net zero renewable grid retrofit iot health regulation the of "
+              "and to in for with on by company said percent target progress reduction").split()
+
+
+def words(rng, n):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(n))
+
+
+def article(rng, n):
+    text = words(rng, n).split(" ")
+    return "\n".join(" ".join(text[i:i + 80]) for i in range(0, len(text), 80))
+
+
+def db_size_mb(path):
+    return round(os.path.getsize(path) / 1e6, 2)
+
+
+def checkpoint():
+    # Under WAL, writes (VACUUM's too) only reach the DB file on a checkpoint
+    from app.database import db
+    conn = db.engine.raw_connection()
+    try:
+        conn.cursor().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+
+def peak_kb(fn, repeat):
+    # Median tracemalloc peak of fn() in KB
+    peaks = []
+    for _ in range(repeat):
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        tracemalloc.stop()
+    return round(sorted(peaks)[len(peaks) // 2] / 1024, 1)
+
+
+def request_loads(session, model, report_id, preview):
+    # What each endpoint reads from the ORM; the identity map is cleared so
+    # every call really loads its rows.
+    def summary():
+        session.expunge_all()
+        return session.get(model, report_id).summary
+
+    def details():
+        session.expunge_all()
+        report = session.get(model, report_id)
+        return preview(report)
+
+    def listing():
+        session.expunge_all()
+        return (session.query(model).filter(model.summary.isnot(None))
+                .order_by(model.date_of_publication.desc()).limit(20).all())
+
+    return {"/summary/<id>": summary, "/reports/<id>": details, "/summaries": listing}
+
+
+def build_legacy_db(db_path, args):
+    # Current schema from create_app(), then turned back into the old layout
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from sqlalchemy import create_engine
+    from app import create_app
+    create_app()
+
+    rng = random.Random(3)
+    engine = create_engine(f"sqlite:///{db_path}")
+    started = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE report_fts")
+        conn.exec_driver_sql("DROP VIEW report_fts_source")
+        conn.exec_driver_sql("CREATE VIRTUAL TABLE report_fts USING fts5("
+                             "title, summary, content, keyword, company, tokenize = 'porter unicode61')")
+        conn.exec_driver_sql("ALTER TABLE report DROP COLUMN content_z")
+        conn.exec_driver_sql("ALTER TABLE report DROP COLUMN content_preview")
+        conn.exec_driver_sql("ALTER TABLE report ADD COLUMN content TEXT")
+        rows = [
+            (i + 1, "RSS Feed", started + timedelta(minutes=i), (started + timedelta(minutes=i)).strftime("%Y-%m-%d"),
+             f"https://example.com/{i}", words(rng, 2).title(), words(rng, 3), "Web Article",
+             words(rng, 300), words(rng, 8), article(rng, args.words))
+            for i in range(args.reports)
+        ]
+        conn.exec_driver_sql(
+            "INSERT INTO report (id, source, date_of_retrieval, date_of_publication, url, company, keyword, "
+            "content_type, summary, title, content) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.exec_driver_sql("INSERT INTO report_fts (rowid, title, summary, content, keyword, company) "
+                             "SELECT id, title, summary, content, keyword, company FROM report")
+        conn.exec_driver_sql("PRAGMA user_version = 3")
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    return engine
+
+
+def measure_legacy(engine, report_id, repeat):
+    from sqlalchemy import Column, DateTime, Integer, String, Text
+    from sqlalchemy.orm import Session, declarative_base
+
+    Base = declarative_base()
+
+    class LegacyReport(Base):
+        __tablename__ = "report"
+        id = Column(Integer, primary_key=True)
+        source = Column(String(255))
+        date_of_retrieval = Column(DateTime)
+        date_of_publication = Column(String(255))
+        url = Column(String(500))
+        company = Column(String(255))
+        companies = Column(Text)
+        content = Column(Text)
+        keyword = Column(String(255))
+        content_type = Column(String(255))
+        summary = Column(Text)
+        title = Column(String(500))
+
+    def preview(report):
+        content = report.content
+        return content[:2000] + "..." if content and len(content) > 2000 else content
+
+    with Session(engine) as session:
+        loads = request_loads(session, LegacyReport, report_id, preview)
+        return {name: peak_kb(fn, repeat) for name, fn in loads.items()}
+
+
+def measure_current(report_id, repeat):
+    from app.database import db
+    from app.models import Report
+    loads = request_loads(db.session, Report, report_id, lambda report: report.content_preview)
+    return {name: peak_kb(fn, repeat) for name, fn in loads.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compressed content storage: DB size and request memory")
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=1500, help="words of content per report")
+    parser.add_argument("--repeat", type=int, default=15, help="memory samples per endpoint")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the generated database")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="esg-content-")
+    db_path = os.path.join(workdir, "data.db")
+    os.environ.update(IMAGE_STORE_DIR=os.path.join(workdir, "images"),
+                      SCRAPER_METRICS_PATH=os.path.join(workdir, "scraper_metrics.json"))
+
+    print(f"🧪 {args.reports} reports of ~{args.words} words in the old layout")
+    engine = build_legacy_db(db_path, args)
+    report_id = args.reports // 2
+    results = {"before": {"db_mb": db_size_mb(db_path), "request_peak_kb": measure_legacy(engine, report_id, args.repeat)}}
+    engine.dispose()
+
+    from app import create_app
+    from app.content_store import zstandard
+    from app.database import db, vacuum
+    started = time.perf_counter()
+    app = create_app()  # runs the migrations
+    migrate_s = round(time.perf_counter() - started, 2)
+    with app.app_context():
+        checkpoint()
+        size_unvacuumed = db_size_mb(db_path)
+        vacuum()
+        checkpoint()
+        results["after"] = {"db_mb": db_size_mb(db_path), "db_mb_before_vacuum": size_unvacuumed,
+                            "request_peak_kb": measure_current(report_id, args.repeat)}
+    results["migration_s"] = migrate_s
+    results["codec"] = "zstd" if zstandard else "zlib"
+
+    before, after = results["before"], results["after"]
+    print(f"🛠️  Migrations ({results['codec']}) took {migrate_s} s")
+    print(f"📦 DB size: {before['db_mb']} MB → {after['db_mb']} MB after VACUUM "
+          f"({after['db_mb_before_vacuum']} MB before)")
+    for name, old in before["request_peak_kb"].items():
+        new = after["request_peak_kb"][name]
+        print(f"   🧠 {name:16s} peak {old:9.1f} KB → {new:9.1f} KB")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+# Offline end-to-end scraper benchmark.
+#
+#   python benchmarks/e2e.py                                   # 200 articles
+#   python benchmarks/e2e.py --articles 1000 --workers 8 --ollama-delay 0.5 --json e2e.json
+#   python benchmarks/e2e.py --json new.json --baseline e2e.json
+#
+# A child process serves local stand-ins for everything run_scraper talks to:
+# article pages (size, images and latency configurable, spread over several
+# "hosts" so per-host limits behave as on the real web), RSS feeds
+# linking to a share of those pages, and a fake Ollama whose /api/generate
+# streams a canned summary after a tunable delay with a fixed number of
+# parallel slots. The real pipeline then runs against a throwaway DB, LLM
+# cache and image store, and throughput, per-stage latency, peak RSS and DB
+# size are reported (and saved as JSON for comparing runs).
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import struct
+import hashlib
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+import subprocess
+import multiprocessing
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+VOCABULARY = (
+    "building ventilation filtration particulate sensor monitoring emissions carbon footprint hvac "
+    "energy efficiency sustainability disclosure investor climate target renewable retrofit "
+    "office school hospital tenant occupancy wellbeing regulation standard compliance audit "
+    "supply chain manufacturing transport fleet utility grid analytics platform cloud device"
+).split()
+SUMMARY_WORDS = 300
+
+
+# --- Stand-in servers (child process) ---
+
+def article_text(config, n):
+    # Deterministic per article; the first `duplicates` articles are light
+    # rewrites of later ones so near-duplicate detection has work to do.
+    source = n + config["articles"] // 2 if n < config["duplicates"] else n
+    rng = random.Random(source)
+    keyword = config["keywords"][source % len(config["keywords"])]
+    words = [rng.choice(VOCABULARY) for _ in range(config["article_words"])]
+    words[::97] = [keyword] * len(words[::97])
+    if source != n:
+        words[len(words) // 2] = "reposted"
+    return [" ".join(words[i:i + 60]) for i in range(0, len(words), 60)]
+
+
+def png_bytes(width, height, salt):
+    # Just enough PNG for the dimension sniffing in app/image_harvest.py
+    header = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height)
+    return header + b"\x08\x02\x00\x00\x00" + hashlib.sha256(salt.encode()).digest() * 64
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = {}
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        config = self.config
+        path = self.path.split("?")[0]
+        if path.startswith("/article/"):
+            n = int(path.rsplit("/", 1)[1].split(".")[0])
+            time.sleep(config["page_latency"])
+            images = "".join(f'<img src="/img/{n}-{k}.png" alt="">' for k in range(config["images_per_page"]))
+            paragraphs = "".join(f"<p>{p}</p>" for p in article_text(config, n))
+            html = (f'<html><head><title>Article {n} - Stand-in News</title>'
+                    f'<meta property="og:site_name" content="Stand-in {n % 7}"></head>'
+                    f'<body>{images}{paragraphs}</body></html>')
+            self.send_body(html.encode(), "text/html; charset=utf-8")
+        elif path.startswith("/img/"):
+            time.sleep(config["page_latency"] / 2)
+            self.send_body(png_bytes(640, 480, path), "image/png")
+        elif path.startswith("/feed/"):
+            k = int(path.rsplit("/", 1)[1].split(".")[0])
+            items = "".join(
+                f"<item><title>Article {url.rsplit('/', 1)[1]}</title><link>{url}</link><guid>{url}</guid>"
+                f"<pubDate>{formatdate(usegmt=True)}</pubDate></item>"
+                for i, url in enumerate(config["rss_urls"]) if i % config["feeds"] == k
+            )
+            rss = f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {k}</title>{items}</channel></rss>'
+            self.send_body(rss.encode(), "application/rss+xml")
+        elif path == "/api/tags":
+            self.send_body(b'{"models": []}', "application/json")
+        else:
+            self.send_body(b"not found", "text/plain", status=404)
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            return self.send_body(b"not found", "text/plain", status=404)
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        digest = hashlib.sha256(request["prompt"].encode()).hexdigest()[:12]
+        if "--- SUMMARY ---" in request["prompt"]:
+            text = f"Stand-in title {digest}"
+        else:
+            rng = random.Random(digest)
+            text = f"**Overview** summary {digest}. " + " ".join(rng.choice(VOCABULARY) for _ in range(SUMMARY_WORDS))
+        if request.get("format") == "json":
+            text = json.dumps({"summary": text, "title": f"Stand-in title {digest}"})
+
+        with self.server.ollama_slots:  # like OLLAMA_NUM_PARALLEL
+            time.sleep(self.config["ollama_delay"])
+        if not request.get("stream"):
+            return self.send_body(json.dumps({"response": text, "done": True}).encode(), "application/json")
+        chunks = [json.dumps({"response": text[i:i + 40], "done": False}) for i in range(0, len(text), 40)]
+        body = ("\n".join(chunks + [json.dumps({"response": "", "done": True})]) + "\n").encode()
+        self.send_body(body, "application/x-ndjson")
+
+
+def serve(config, ready):
+    StandInHandler.config = config
+
+    # Every stand-in host is its own port on 127.0.0.1 (the only loopback
+    # address macOS has); the per-host limiter keys on host:port
+    def start(host="127.0.0.1"):
+        server = ThreadingHTTPServer((host, 0), StandInHandler)
+        server.daemon_threads = True
+        server.ollama_slots = threading.Semaphore(config["ollama_slots"])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://{host}:{server.server_port}"
+
+    hosts = [start() for _ in range(config["hosts"])]
+    ollama = start()
+    urls = [f"{hosts[n % len(hosts)]}/article/{n}.html" for n in range(config["articles"])]
+    rss_count = int(len(urls) * config["rss_share"])
+    config["rss_urls"] = urls[:rss_count]
+    feeds = [f"{hosts[0]}/feed/{k}.xml" for k in range(config["feeds"])] if rss_count else []
+    ready.put({"ollama": ollama, "feeds": feeds, "discovered": urls[rss_count:]})
+    threading.Event().wait()
+
+
+def start_stand_ins(config):
+    ctx = multiprocessing.get_context("fork")
+    ready = ctx.Queue()
+    process = ctx.Process(target=serve, args=(config, ready), daemon=True)
+    process.start()
+    addresses = ready.get(timeout=30)
+    return process, addresses["ollama"], addresses["feeds"], addresses["discovered"]
+
+
+# --- Measurement ---
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def db_size_mb(path):
+    return round(sum(os.path.getsize(p) for p in (path, path + "-wal", path + "-shm") if os.path.exists(p)) / 1e6, 2)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"📏 Against {baseline_path}:")
+    for key in ("articles_per_s", "wall_s", "peak_rss_mb", "db_mb", "ner_docs_per_s"):
+        old, new = baseline.get(key), results.get(key)
+        if old and new is not None:
+            print(f"   {key:24s} {old:>10} → {new:<10} ({(new - old) / old:+.0%})")
+    for group in ("stages", "spans"):
+        for name, stats in results[group].items():
+            old = baseline.get(group, {}).get(name, {}).get("p95_ms")
+            if old:
+                print(f"   {name + ' p95 ms':24s} {old:>10} → {stats['p95_ms']:<10} "
+                      f"({(stats['p95_ms'] - old) / old:+.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end scraper benchmark")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--article-words", type=int, default=800)
+    parser.add_argument("--images-per-page", type=int, default=3)
+    parser.add_argument("--page-latency", type=float, default=0.05, help="seconds per page/image response")
+    parser.add_argument("--hosts", type=int, default=8, help="stand-in hosts (ports on 127.0.0.1) the articles are spread over")
+    parser.add_argument("--feeds", type=int, default=4)
+    parser.add_argument("--rss-share", type=float, default=0.5, help="share of articles found via RSS")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.05, help="share of articles that are reposts")
+    parser.add_argument("--ollama-delay", type=float, default=0.2, help="seconds per generate call")
+    parser.add_argument("--ollama-slots", type=int, default=4, help="parallel generations the fake server allows")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--per-host", type=int, default=2)
+    parser.add_argument("--ollama-parallel", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--combined", action="store_true", help="one JSON call for summary and title")
+    parser.add_argument("--chunk-tokens", type=int, default=None,
+                        help="summary chunk budget (default: the scraper's); longer articles are map-reduced")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier --json output to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    parser.add_argument("--keep", action="store_true", help="keep the work directory")
+    args = parser.parse_args()
+
+    # Read directly: importing anything from app/ this early would fix its
+    # env-derived paths (image store, metrics snapshot ...) before the
+    # overrides below
+    with open(os.environ.get("KEYWORDS_FILE", os.path.join(ROOT, "app", "keywords.json")), encoding="utf-8") as f:
+        keywords = json.load(f)
+    first, second = keywords.get("first_priority", []), keywords.get("second_priority", [])
+    config = {
+        "articles": args.articles, "article_words": args.article_words, "images_per_page": args.images_per_page,
+        "page_latency": args.page_latency, "hosts": args.hosts, "feeds": args.feeds, "rss_share": args.rss_share,
+        "duplicates": int(args.articles * args.duplicate_ratio), "ollama_delay": args.ollama_delay,
+        "ollama_slots": args.ollama_slots, "keywords": first + second,
+    }
+    servers, ollama_url, feeds, discovered = start_stand_ins(config)
+
+    workdir = tempfile.mkdtemp(prefix="esg-e2e-")
+    db_path = os.path.join(workdir, "data.db")
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{db_path}",
+        LLM_CACHE_PATH=os.path.join(workdir, "llm_cache.db"),
+        IMAGE_STORE_DIR=os.path.join(workdir, "images"),
+        OLLAMA_URL=ollama_url,
+        SCRAPER_METRICS_PATH=os.path.join(workdir, "scraper_metrics.json"),
+    )
+    import app.scraper as scraper
+    from app.http_client import configure_session
+    from app.inference import inference_queue
+    from app.metrics import metrics, quantile, summary_table
+
+    scraper.COMBINED_SUMMARY_TITLE = args.combined
+    scraper.SUMMARY_CHUNK_TOKENS = args.chunk_tokens or scraper.SUMMARY_CHUNK_TOKENS
+    scraper.host_limiter.limit = args.per_host
+    configure_session(pool_maxsize=max(10, args.workers))
+    inference_queue.resize(args.ollama_parallel)
+    scraper.get_app()  # create the DB before the clock starts
+
+    print(f"🧪 {args.articles} articles ({len(discovered)} discovered, {args.articles - len(discovered)} via "
+          f"{len(feeds)} feeds), {args.workers} workers, Ollama {args.ollama_delay}s × {args.ollama_slots} slots")
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else open(os.devnull, "w")):
+        run = scraper.run_scraper(workers=args.workers, batch_size=args.batch_size, rss_feeds=feeds,
+                                  discovered_urls=discovered)
+    wall = time.perf_counter() - started
+    servers.terminate()
+    snapshot = metrics.snapshot()  # spans from the run (run_scraper resets at start)
+
+    added = sum(run["added"].values())
+    results = {
+        "wall_s": round(wall, 2),
+        "reports_added": added,
+        "articles_per_s": round(added / wall, 2) if wall else 0.0,
+        "frontier": run["frontier"],
+        "peak_rss_mb": peak_rss_mb(),
+        "db_mb": db_size_mb(db_path),
+        "stages": {},  # frontier stages: one work() call per task
+        "spans": {},   # everything else: fetch, parse, ollama, db_commit ...
+        "counters": {},
+    }
+    errors = {c["labels"].get("stage"): c["value"] for c in snapshot["counters"] if c["name"] == "stage_errors"}
+    for span in snapshot["spans"]:
+        stats = {
+            "count": span["count"],
+            "total_s": round(span["sum"], 2),
+            "p50_ms": round(quantile(span["samples"], 0.50) * 1000, 1),
+            "p95_ms": round(quantile(span["samples"], 0.95) * 1000, 1),
+            "p99_ms": round(quantile(span["samples"], 0.99) * 1000, 1),
+            "max_ms": round(span["max"] * 1000, 1),
+        }
+        if span["name"] == "stage":
+            stage = span["labels"]["stage"]
+            results["stages"][stage] = dict(stats, errors=errors.get(stage, 0))
+        else:
+            label = ",".join([span["name"]] + [f"{k}={v}" for k, v in sorted(span["labels"].items())])
+            results["spans"][label] = stats
+    for counter in snapshot["counters"]:
+        label = ",".join([counter["name"]] + [f"{k}={v}" for k, v in sorted(counter["labels"].items())])
+        results["counters"][label] = counter["value"]
+
+    ner = next((span for span in snapshot["spans"] if span["name"] == "ner"), None)
+    ner_docs = sum(c["value"] for c in snapshot["counters"] if c["name"] == "ner_docs")
+    results["ner_docs_per_s"] = round(ner_docs / ner["sum"], 1) if ner and ner["sum"] else None
+
+    print(f"⏱️  {results['wall_s']} s wall, {added} reports → {results['articles_per_s']} articles/s")
+    print(f"🗂️  Frontier: " + ", ".join(f"{state} {count}" for state, count in sorted(run["frontier"].items())))
+    print(f"🧠 Peak RSS {results['peak_rss_mb']} MB | 📦 DB {results['db_mb']} MB")
+    if results["ner_docs_per_s"] is not None:
+        print(f"🏷️  NER {results['ner_docs_per_s']} docs/s ({ner_docs} docs in {ner['count']} batches)")
+    for stage, stats in results["stages"].items():
+        print(f"   {stage:10s} n={stats['count']:<5d} p50 {stats['p50_ms']} ms | p95 {stats['p95_ms']} ms | "
+              f"p99 {stats['p99_ms']} ms | max {stats['max_ms']} ms | errors {stats['errors']}")
+    if args.verbose:
+        print(summary_table(snapshot))
+
+    if args.baseline:
+        compare(results, args.baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "revision": git_revision(), "results": results}, f, indent=2)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
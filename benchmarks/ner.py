@@ -0,0 +1,89 @@
+# Company attribution (spaCy NER) throughput in documents per second.
+#
+#   python benchmarks/ner.py                      # 400 synthetic articles
+#   python benchmarks/ner.py --docs 2000 --processes 1,2,4 --json ner.json
+#
+# Compares the naive per-document nlp(text) call with the full pipeline
+# against app.entities.extract_companies (nlp.pipe in batches, only the
+# components NER needs) for each batch size and process count. Needs the
+# en_core_web_sm model ("python -m spacy download en_core_web_sm").
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+COMPANIES = ("Siemens", "Johnson Controls", "Honeywell International", "Carrier Global", "Daikin Industries",
+             "Schneider Electric", "Trane Technologies", "Microsoft", "Unilever", "Danone", "BlackRock",
+             "Airthings", "Awair", "Ecobee", "Samsung Electronics", "LG Electronics")
+SENTENCES = (
+    "{a} said on Tuesday it would cut operational emissions by {n} percent before 2030.",
+    "The retrofit, carried out with {b}, replaced the HVAC filters in {n} office buildings.",
+    "Analysts at {b} expect indoor air quality sensors to become standard in new construction.",
+    "{a} reported a {n} percent drop in energy use after installing smart ventilation controls.",
+    "According to {a}, CO2 levels in the monitored classrooms fell below {n}0 ppm.",
+    "The sustainability report from {a} details progress on its net zero targets.",
+    "Building owners are under pressure from investors to disclose ESG metrics for their portfolios.",
+    "Regulators have proposed new limits on fine particulate matter and volatile organic compounds.",
+)
+
+
+def make_docs(count, words):
+    rng = random.Random(42)
+    docs = []
+    for _ in range(count):
+        lead, partner = rng.sample(COMPANIES, 2)
+        sentences, length = [], 0
+        while length < words:
+            sentence = rng.choice(SENTENCES).format(a=lead, b=partner, n=rng.randint(2, 60))
+            sentences.append(sentence)
+            length += len(sentence.split())
+        docs.append("\n".join(" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)))
+    return docs
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NER throughput")
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--words", type=int, default=800, help="words per synthetic article")
+    parser.add_argument("--batch-sizes", default="8,32,128")
+    parser.add_argument("--processes", default="1,2", help="comma separated n_process values")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    import spacy
+    from app.entities import extract_companies, ner_pipes
+    nlp = spacy.load("en_core_web_sm")
+    docs = make_docs(args.docs, args.words)
+    list(nlp.pipe(docs[:4]))  # warm up
+    print(f"🧪 {len(docs)} articles of ~{args.words} words; NER keeps {[p for p in nlp.pipe_names if p not in ner_pipes(nlp)]}")
+
+    results = {}
+    naive = timed(lambda: [list(nlp(doc).ents) for doc in docs])
+    results["nlp(doc), full pipeline"] = round(len(docs) / naive, 1)
+    sample = extract_companies(nlp, docs[:1])[0]
+    for n_process in (int(n) for n in args.processes.split(",")):
+        for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+            elapsed = timed(lambda: extract_companies(nlp, docs, batch_size=batch_size, n_process=n_process))
+            results[f"pipe batch {batch_size}, {n_process} proc"] = round(len(docs) / elapsed, 1)
+
+    baseline = results["nlp(doc), full pipeline"]
+    for name, docs_per_s in results.items():
+        print(f"   {name:28s} {docs_per_s:8.1f} docs/s  ({docs_per_s / baseline:.1f}×)")
+    print(f"🏷️  first article → {sample}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "docs_per_s": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
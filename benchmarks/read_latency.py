@@ -0,0 +1,204 @@
+# API read latency while the scraper is writing heavily.
+#
+#   python benchmarks/read_latency.py                  # tuned vs legacy, 20 s each
+#   python benchmarks/read_latency.py --seconds 60 --json read_latency.json
+#
+# For each mode a throwaway DB is seeded, then a separate writer process
+# pushes reports through the scraper's write path (WriterQueue, and the
+# frontier's claim/save_outcomes for the fetch, filter and summarize stages)
+# as fast as it can while this process serves /summaries and /reports
+# through the Flask test client.
+# "legacy" reproduces the old defaults (rollback journal, no busy timeout);
+# "tuned" uses app.database.SQLITE_PRAGMAS (WAL etc.).
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+LEGACY_PRAGMAS = {"journal_mode": "DELETE", "busy_timeout": 0, "synchronous": "FULL"}
+VOCABULARY = ("air quality indoor sensor emissions carbon hvac ventilation filter co2 radon building "
+              "energy esg report climate net zero renewable grid retrofit iot health regulation").split()
+ENDPOINTS = ("/summaries", "/reports?limit=50")
+
+
+def words(rng, n):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(n))
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+def make_app(db_path, mode):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app import create_app, database
+    if not hasattr(database, "TUNED_PRAGMAS"):
+        database.TUNED_PRAGMAS = dict(database.SQLITE_PRAGMAS)
+    database.SQLITE_PRAGMAS = dict(LEGACY_PRAGMAS if mode == "legacy" else database.TUNED_PRAGMAS)
+    return create_app()
+
+
+def fake_report(rng, url):
+    return {
+        "source": "RSS Feed",
+        "date_of_publication": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        "url": url,
+        "company": words(rng, 2).title(),
+        "keyword": words(rng, 3),
+        "content_type": "Web Article",
+        "content": words(rng, 800),
+        "summary": words(rng, 150),
+        "title": words(rng, 8),
+    }
+
+
+def run_writer(db_path, mode, seconds, batch_size):
+    # Child process: the scraper side. Each batch of fake articles is
+    # enqueued, then claimed and saved once per stage, like crawled articles.
+    from app.frontier import Stage, claim, enqueue, save_outcomes
+    from app.scraper import save_filtered, save_report_fields
+    from app.writer import WriterQueue
+    app = make_app(db_path, mode)
+    rng = random.Random(os.getpid())
+    lease = timedelta(minutes=5)
+    stages = (
+        (Stage("fetch", "discovered", "fetched", None, None, 1, lease),
+         lambda report: {"content": report["content"], "company": report["company"]}),
+        (Stage("filter", "fetched", "filtered", None, save_filtered, 1, lease),
+         lambda report: {"keyword": report["keyword"], "simhash": rng.getrandbits(64)}),
+        (Stage("summarize", "filtered", "summarized", None, save_report_fields, 1, lease),
+         lambda report: {"summary": report["summary"], "title": report["title"]}),
+    )
+    written = 0
+    deadline = time.monotonic() + seconds
+    # The save functions print a line per article; stdout is for the result
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet), WriterQueue(app) as writer:
+        while time.monotonic() < deadline:
+            reports = {}
+            for i in range(batch_size):
+                url = f"https://example.com/w/{written + i}"
+                reports[url] = fake_report(rng, url)
+            try:
+                writer.submit(enqueue, [(url, None) for url in reports], "RSS Feed").result()
+                for stage, result in stages:
+                    tasks = writer.submit(claim, stage.state, batch_size, stage.lease).result()
+                    outcomes = [(task, result(reports[task["url"]]), None) for task in tasks]
+                    writer.submit(save_outcomes, stage, outcomes).result()
+            except Exception:
+                pass  # counted in writer.failures
+            written += batch_size
+    print(json.dumps({"queued": written, "failed_batches": writer.failures}))
+
+
+def seed(app, reports):
+    from sqlalchemy import insert
+    from app.database import db
+    from app.models import Report
+    from app.content_store import content_columns
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        rows = []
+        for i in range(reports):
+            report = fake_report(rng, f"https://example.com/seed/{i}")
+            content = report.pop("content")
+            rows.append(dict(report, date_of_retrieval=now, **content_columns(content)))
+        db.session.execute(insert(Report), rows)
+        db.session.commit()
+
+
+def run_mode(mode, args):
+    workdir = tempfile.mkdtemp(prefix=f"esg-read-latency-{mode}-")
+    db_path = os.path.join(workdir, "bench.db")
+    app = make_app(db_path, mode)
+    seed(app, args.seed)
+    app.logger.disabled = True  # failed reads are counted, not logged
+    client = app.test_client()
+    client.get("/summaries")  # warm templates and the image listing
+
+    writer = subprocess.Popen(
+        [sys.executable, __file__, "--role", "writer", "--mode", mode, "--db", db_path,
+         "--seconds", str(args.seconds), "--batch-size", str(args.batch_size)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    time.sleep(1.0)  # let the writer get going
+
+    samples = {endpoint: [] for endpoint in ENDPOINTS}
+    errors = 0
+    while writer.poll() is None:
+        for endpoint in ENDPOINTS:
+            started = time.perf_counter()
+            try:
+                status = client.get(endpoint).status_code
+            except Exception:
+                status = 500
+            elapsed = (time.perf_counter() - started) * 1000
+            if status >= 500:
+                errors += 1
+            else:
+                samples[endpoint].append(elapsed)
+    writer_result = json.loads(writer.stdout.read().strip().splitlines()[-1] or "{}")
+
+    result = {"writer": writer_result, "read_errors": errors, "latency": {}}
+    for endpoint, values in samples.items():
+        if not values:
+            continue
+        result["latency"][endpoint] = {
+            "requests": len(values),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+            "max_ms": round(max(values), 2),
+            "mean_ms": round(statistics.mean(values), 2),
+        }
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read latency during heavy writes")
+    parser.add_argument("--modes", default="legacy,tuned", help="comma separated: legacy, tuned")
+    parser.add_argument("--seconds", type=float, default=20, help="length of the write run per mode")
+    parser.add_argument("--seed", type=int, default=2000, help="reports in the DB before the run")
+    parser.add_argument("--batch-size", type=int, default=20, help="reports per writer commit")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the generated databases")
+    parser.add_argument("--role", default="reader", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.role == "writer":
+        run_writer(args.db, args.mode, args.seconds, args.batch_size)
+        return
+
+    results = {}
+    for mode in args.modes.split(","):
+        print(f"🧪 {mode}: {args.seconds:g} s of writes, batches of {args.batch_size}")
+        result = results[mode] = run_mode(mode, args)
+        print(f"   ✍️  writer queued {result['writer'].get('queued', 0)} reports, "
+              f"{result['writer'].get('failed_batches', 0)} failed write jobs")
+        print(f"   ❌ {result['read_errors']} failed reads")
+        for endpoint, stats in result["latency"].items():
+            print(f"   📖 {endpoint:20s} n={stats['requests']:<5d} p50 {stats['p50_ms']} ms | "
+                  f"p95 {stats['p95_ms']} ms | p99 {stats['p99_ms']} ms | max {stats['max_ms']} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# FTS5 search benchmark on a synthetic corpus.
+#
+#   python benchmarks/search_bench.py                 # 100k reports
+#   python benchmarks/search_bench.py --reports 20000 --json search.json
+#
+# Builds a throwaway SQLite DB, reports index build time and size, the cost of
+# the incremental (after_flush) sync per inserted report, and query latency
+# percentiles for plain and filtered searches.
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+VOCABULARY = (
+    "air quality indoor outdoor sensor sensors monitoring emissions carbon footprint hvac "
+    "ventilation filter filtration particulate pm2.5 co2 voc radon humidity building office "
+    "school hospital energy efficiency sustainability esg report disclosure investor climate "
+    "net zero scope target renewable solar wind grid utility retrofit smart iot aiot device "
+    "platform analytics data cloud company board governance social community health wellbeing "
+    "regulation epa standard compliance audit supply chain manufacturing transport fleet"
+).split()
+SOURCES = ("RSS Feed", "Web Article")
+QUERIES = ("indoor air quality", "co2 sensors", "carbon footprint", "hvac retrofit", "esg disclosure",
+           "radon", "net zero target", "smart building iot", "sustain*", "pm2.5 filtration")
+
+
+def words(rng, n):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(n))
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 search benchmark")
+    parser.add_argument("--reports", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=400, help="words of content per report")
+    parser.add_argument("--incremental", type=int, default=1000, help="reports inserted through the ORM sync path")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per query")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the generated database")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="esg-search-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+
+    from sqlalchemy import insert
+    from app import create_app
+    from app.database import db, vacuum
+    from app.models import Report
+    from app.content_store import content_columns
+    from app.search import rebuild_search_index, search_reports
+
+    rng = random.Random(42)
+    app = create_app()
+    results = {"reports": args.reports, "words_per_report": args.words}
+
+    with app.app_context():
+        print(f"🧪 Generating {args.reports} synthetic reports in {db_path}")
+        start_date = datetime(2023, 1, 1)
+        batch = []
+        for i in range(args.reports):
+            published = start_date + timedelta(minutes=i * 7)
+            batch.append({
+                "source": SOURCES[i % 2],
+                "date_of_retrieval": published,
+                "date_of_publication": published.strftime("%Y-%m-%d"),
+                "url": f"https://example.com/{i}",
+                "company": words(rng, 2).title(),
+                "keyword": words(rng, 3),
+                "title": words(rng, 8),
+                "summary": words(rng, 120),
+                **content_columns(words(rng, args.words)),
+            })
+            if len(batch) == 5000:
+                # Core insert skips the ORM hook; the index is rebuilt below
+                db.session.execute(insert(Report), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(Report), batch)
+        db.session.commit()
+
+        vacuum()
+        size_without_index = os.path.getsize(db_path)
+
+        started = time.perf_counter()
+        with db.engine.begin() as conn:
+            rebuild_search_index(conn)
+        results["index_build_s"] = round(time.perf_counter() - started, 2)
+        vacuum()
+        results["db_mb"] = round(os.path.getsize(db_path) / 1e6, 1)
+        results["index_mb_approx"] = round((os.path.getsize(db_path) - size_without_index) / 1e6, 1)
+        print(f"📦 Index built in {results['index_build_s']} s, DB {results['db_mb']} MB "
+              f"(~{results['index_mb_approx']} MB for the index)")
+
+        started = time.perf_counter()
+        for i in range(args.incremental):
+            db.session.add(Report(source="RSS Feed", date_of_retrieval=datetime.utcnow(),
+                                  date_of_publication="2025-01-01", url=f"https://example.com/new/{i}",
+                                  title=words(rng, 8), summary=words(rng, 120), content=words(rng, args.words)))
+            db.session.commit()
+        per_report = (time.perf_counter() - started) / max(1, args.incremental) * 1000
+        results["insert_with_sync_ms"] = round(per_report, 2)
+        print(f"✍️  Insert + commit with incremental index sync: {per_report:.2f} ms/report")
+
+        latency = {}
+        for label, kwargs in (("plain", {}), ("source+date filter", {"source": "RSS Feed", "since": "2024-01-01"})):
+            samples = []
+            for q in QUERIES:
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    search_reports(db.session, q, limit=20, **kwargs)
+                    samples.append((time.perf_counter() - started) * 1000)
+            latency[label] = {
+                "p50_ms": round(percentile(samples, 50), 2),
+                "p95_ms": round(percentile(samples, 95), 2),
+                "p99_ms": round(percentile(samples, 99), 2),
+                "mean_ms": round(statistics.mean(samples), 2),
+            }
+            print(f"🔎 {label:20s} p50 {latency[label]['p50_ms']} ms | p95 {latency[label]['p95_ms']} ms "
+                  f"| p99 {latency[label]['p99_ms']} ms")
+        results["query_latency"] = latency
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Startup benchmark: measures import cost of the web app and the scraper with
+# `python -X importtime` and fails if either goes over its budget, so a heavy
+# module-level import (spaCy, googlesearch, feedparser ...) gets caught.
+#
+#   python benchmarks/startup.py               # table + budget check
+#   python benchmarks/startup.py --json out.json --runs 5
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Budgets in milliseconds of cumulative import time for the top-level module
+TARGETS = {
+    "run": ("import run", 1500),
+    "app.scraper": ("import app.scraper", 1500),
+}
+
+# Modules that must not be imported at startup
+FORBIDDEN = ("spacy", "googlesearch", "feedparser")
+
+
+def parse_importtime(stderr):
+    # "import time: self [us] | cumulative | imported package"
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure(statement):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, "PYTHONPATH": ROOT},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{statement!r} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time startup benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="samples per target (median is reported)")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per target")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for name, (statement, budget_ms) in TARGETS.items():
+        samples = [measure(statement) for _ in range(args.runs)]
+        total_ms = statistics.median(s[name][1] for s in samples) / 1000
+        last = samples[-1]
+        slowest = sorted(last.items(), key=lambda kv: kv[1][0], reverse=True)[:args.top]
+        forbidden = sorted(m for m in last if m.split(".")[0] in FORBIDDEN)
+
+        ok = total_ms <= budget_ms and not forbidden
+        failed = failed or not ok
+        results[name] = {
+            "import_ms": round(total_ms, 1),
+            "budget_ms": budget_ms,
+            "ok": ok,
+            "forbidden_imports": forbidden,
+            "slowest_self_ms": {m: round(v[0] / 1000, 1) for m, v in slowest},
+        }
+
+        print(f"{'✅' if ok else '❌'} {name}: {total_ms:.0f} ms (budget {budget_ms} ms)")
+        for module, (self_us, _) in slowest:
+            print(f"     {self_us / 1000:8.1f} ms  {module}")
+        if forbidden:
+            print(f"     eagerly imported: {', '.join(forbidden)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
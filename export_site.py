@@ -0,0 +1,21 @@
+import os
+import argparse
+from app import create_app
+from app.export import ARCHIVE_PAGE_SIZE, INDEX_SIZE, export_site
+
+# Renders summaries.html and the paginated archive from the DB into static
+# files, re-rendering only what changed since the last export.
+parser = argparse.ArgumentParser(description="Export the summaries blog as static HTML")
+parser.add_argument("--out", default=os.path.dirname(os.path.abspath(__file__)),
+                    help="output directory (default: repository root)")
+parser.add_argument("--index-size", type=int, default=INDEX_SIZE)
+parser.add_argument("--page-size", type=int, default=ARCHIVE_PAGE_SIZE)
+parser.add_argument("--force", action="store_true", help="ignore the manifest and rebuild everything")
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    stats = export_site(args.out, index_size=args.index_size, page_size=args.page_size, force=args.force)
+    print(f"✅ Exported {stats['reports']} summaries to {args.out}")
+    print(f"📝 Cards rendered: {stats['cards_rendered']} | Pages written: {stats['pages_written']}/{stats['pages_total']} | Images copied: {stats['images_copied']}")
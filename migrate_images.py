@@ -0,0 +1,41 @@
+import os
+from app import create_app
+from app.database import db, vacuum
+from app.models import ESGImage
+from app.image_store import normalize_content_type, store_image_bytes
+
+# Moves image bytes still stored inline in esg_image.image_data into the
+# content-addressed image store, then VACUUMs to give the space back.
+BATCH_SIZE = 200
+
+app = create_app()
+
+with app.app_context():
+    db_path = db.engine.url.database
+    size_before = os.path.getsize(db_path)
+
+    moved = 0
+    while True:
+        images = (
+            ESGImage.query.options(db.undefer(ESGImage.image_data))
+            .filter(ESGImage.image_data.isnot(None))
+            .limit(BATCH_SIZE)
+            .all()
+        )
+        if not images:
+            break
+        for img in images:
+            img.sha256 = store_image_bytes(img.image_data)
+            img.size = len(img.image_data)
+            img.content_type = normalize_content_type(img.content_type)
+            img.image_data = None
+        db.session.commit()
+        moved += len(images)
+        print(f"📦 Moved {moved} images...")
+
+    db.session.close()
+    vacuum()
+
+    size_after = os.path.getsize(db_path)
+    print(f"✅ Moved {moved} images out of the database.")
+    print(f"💾 Database size: {size_before / 1e6:.1f} MB → {size_after / 1e6:.1f} MB")
@@ -1,10 +1,13 @@
 from app import create_app
 from app.database import db
 from app.models import Report, ESGImage  # import all models
+from app.search import rebuild_search_index
 
 app = create_app()
 
 with app.app_context():
     db.drop_all()
     db.create_all()
+    with db.engine.begin() as conn:
+        rebuild_search_index(conn)  # drop index entries of the deleted reports
     print("✅ Database schema reset successfully.")
@@ -0,0 +1,48 @@
+# URL normalization for discovered and RSS links (app/discovery.py).
+#
+#   python -m pytest -q tests
+import pytest
+
+from app.discovery import normalize_url
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.google.com/url?q=https://example.com/story&sa=U",
+    "https://google.com/url?url=https://example.com/story",
+    "https://www.google.co.uk/url?q=https://example.com/story",
+    "https://www.google.com.au/url?q=https://example.com/story",
+    "https://www.google.de/url?q=https://example.com/story",
+    "https://news.google.com/rss/articles/abc?url=https://example.com/story",
+    "https://www.google.com/url?q=https://www.google.com/url?q%3Dhttps://example.com/story",
+])
+def test_google_redirects_are_unwrapped(url):
+    assert normalize_url(url) == "https://example.com/story"
+
+
+@pytest.mark.parametrize("url", [
+    "https://google.evil.com/url?q=https://phish.com/",
+    "https://notgoogle.com/url?q=https://phish.com/",
+    "https://www.google.com.evil.net/url?q=https://phish.com/",
+    "https://google.example/url?q=https://phish.com/",
+])
+def test_other_hosts_are_not_unwrapped(url):
+    assert "phish.com" not in normalize_url(url).split("?")[0]
+
+
+def test_tracking_parameters_are_dropped():
+    url = "https://example.com/a?id=7&utm_source=rss&UTM_Medium=x&fbclid=abc&page=2#comments"
+    assert normalize_url(url) == "https://example.com/a?id=7&page=2"
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://Example.COM:443/a", "https://example.com/a"),
+    ("http://example.com:80", "http://example.com/"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("https://example.com./a", "https://example.com/a"),
+])
+def test_scheme_host_and_port(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_non_http_urls_are_left_alone():
+    assert normalize_url(" mailto:news@example.com ") == "mailto:news@example.com"
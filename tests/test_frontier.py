@@ -0,0 +1,165 @@
+# Crawl frontier state machine (app/frontier.py): batches saved by
+# save_outcomes, and tasks left behind by a run that stopped part way.
+#
+#   python -m pytest -q tests
+import os
+import json
+import sqlite3
+import tempfile
+from datetime import timedelta
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="esg-tests-")
+for name, value in {"LLM_CACHE_PATH": "llm_cache.db", "IMAGE_STORE_DIR": "images",
+                    "SCRAPER_METRICS_PATH": "scraper_metrics.json"}.items():
+    os.environ.setdefault(name, os.path.join(_scratch, value))
+
+from app import create_app
+from app.database import db
+from app.dedup import add_fingerprint, simhash
+from app.frontier import (FAILED, SkipTask, Stage, claim, enqueue, release_leases, requeue, retries_pending,
+                          retry_delay, save_outcomes)
+from app.models import CrawlTask, Report, ReportFingerprint, utcnow
+from app import scraper
+
+LEASE = timedelta(minutes=5)
+CONTENT = "Indoor air quality sensors cut HVAC energy use in office buildings " * 20
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'data.db'}")
+    app = create_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def committed_rows(sql):
+    # What another connection sees, i.e. only what was really committed
+    with sqlite3.connect(db.engine.url.database) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def task_row(url):
+    db.session.expire_all()
+    return CrawlTask.query.filter_by(url=url).one()
+
+
+def save_report(task, result):
+    db.session.add(Report(source="RSS Feed", url=task["url"], date_of_retrieval=utcnow(),
+                          content_type="Web Article", content=CONTENT))
+    if result == "skip":
+        raise SkipTask("skipped after saving")
+    if result == "crash":
+        raise KeyboardInterrupt
+    return {}
+
+
+REPORT_STAGE = Stage("report", "discovered", "fetched", None, save_report, 1, LEASE)
+
+
+def test_batch_is_one_transaction(app):
+    enqueue([("https://example.com/a", None), ("https://example.com/b", None)], "RSS Feed")
+    a, b = claim("discovered", 10, LEASE)
+    with pytest.raises(KeyboardInterrupt):
+        save_outcomes(REPORT_STAGE, [(a, None, None), (b, "crash", None)])
+    # The first task's savepoint was released, but nothing is committed
+    assert committed_rows("SELECT url FROM report") == []
+    db.session.rollback()
+    assert {row.state for row in CrawlTask.query} == {"discovered"}
+
+
+def test_failed_save_costs_an_attempt(app):
+    db.session.add(Report(source="RSS Feed", url="https://example.com/taken", date_of_retrieval=utcnow(),
+                          content_type="Web Article", content=CONTENT))
+    db.session.commit()
+    enqueue([("https://example.com/taken", None), ("https://example.com/c", None)], "RSS Feed")
+    taken, other = claim("discovered", 10, LEASE)
+
+    # The duplicate URL only fails when the savepoint is flushed
+    save_outcomes(REPORT_STAGE, [(taken, "skip", None), (other, None, None)])
+
+    row = task_row("https://example.com/taken")
+    assert (row.state, row.attempts) == ("discovered", 1)
+    assert "UNIQUE" in row.last_error
+    assert task_row("https://example.com/c").state == "fetched"
+
+    for attempt in (1, 2):
+        # Held back for the retry delay, then claimable again
+        assert claim("discovered", 10, LEASE) == []
+        assert retries_pending("discovered") == 1
+        assert task_row("https://example.com/taken").lease_until > utcnow() + retry_delay(attempt) - timedelta(seconds=5)
+        db.session.execute(CrawlTask.__table__.update().values(lease_until=utcnow() - timedelta(seconds=1)))
+        tasks = claim("discovered", 10, LEASE)
+        save_outcomes(REPORT_STAGE, [(task, "skip", None) for task in tasks])
+    row = task_row("https://example.com/taken")
+    assert (row.state, row.lease_until) == (FAILED, None)
+    assert retries_pending("discovered") == 0
+
+
+def test_filtered_task_resumes_after_interrupted_batch(app):
+    url = "https://example.com/resumed"
+    enqueue([(url, None)], "RSS Feed")
+    db.session.execute(CrawlTask.__table__.update().values(
+        state="fetched", payload=json.dumps({"content": CONTENT, "company": "Example"})))
+    # What a batch that stopped after saving the report left behind
+    report = Report(source="RSS Feed", url=url, date_of_retrieval=utcnow(), content_type="Web Article",
+                    content=CONTENT)
+    db.session.add(report)
+    db.session.flush()
+    add_fingerprint(url, simhash(CONTENT), report_id=report.id)
+    db.session.commit()
+
+    stage = Stage("filter", "fetched", "filtered", scraper.filter_stage, scraper.save_filtered, 1, LEASE)
+    (task,) = claim("fetched", 10, LEASE)
+    save_outcomes(stage, [(task, scraper.filter_stage(task), None)])
+
+    row = task_row(url)
+    assert (row.state, row.report_id, row.last_error) == ("filtered", report.id, None)
+    assert Report.query.count() == 1
+    assert ReportFingerprint.query.count() == 1
+
+
+def test_leases_of_a_stopped_run_are_released(app):
+    enqueue([("https://example.com/leased", None)], "RSS Feed")
+    assert len(claim("discovered", 10, timedelta(minutes=30))) == 1
+    # The run holding the lease died; its task isn't claimable until released
+    assert claim("discovered", 10, LEASE) == []
+    assert release_leases() == 1
+    (task,) = claim("discovered", 10, LEASE)
+    assert task["url"] == "https://example.com/leased"
+
+
+def test_requeue_keeps_earlier_stage_output(app):
+    url = "https://example.com/unsummarized"
+    enqueue([(url, None)], "RSS Feed")
+    images = [[1, "https://example.com/chart.png"]]
+    db.session.execute(CrawlTask.__table__.update().values(
+        state=FAILED, payload=json.dumps({"content": "old", "images": images})))
+    db.session.commit()
+
+    requeue([dict(url=url, source="RSS Feed", payload={"content": CONTENT, "keyword": "air quality"})],
+            "attributed")
+
+    row = task_row(url)
+    assert (row.state, row.attempts) == ("attributed", 0)
+    assert json.loads(row.payload) == {"content": CONTENT, "keyword": "air quality", "images": images}
+
+
+def test_only_reports_wanting_a_summary_are_requeued(app):
+    reports = {"https://example.com/rss-long": ("RSS Feed", CONTENT, None),
+               "https://example.com/rss-short": ("RSS Feed", CONTENT[:1000], None),
+               "https://example.com/search-short": ("Google Search", CONTENT[:300], None),
+               "https://example.com/empty": ("Google Search", "", None),
+               "https://example.com/summarized": ("RSS Feed", CONTENT, "Already summarized")}
+    for url, (source, content, summary) in reports.items():
+        db.session.add(Report(source=source, url=url, date_of_retrieval=utcnow(), content_type="Web Article",
+                              content=content, summary=summary))
+    db.session.commit()
+
+    assert scraper.requeue_unsummarized() == 2
+    tasks = {row.url: json.loads(row.payload) for row in CrawlTask.query.filter_by(state="attributed")}
+    assert set(tasks) == {"https://example.com/rss-long", "https://example.com/search-short"}
+    assert tasks["https://example.com/rss-long"]["content"] == CONTENT
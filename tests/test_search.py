@@ -0,0 +1,60 @@
+# Full-text search index (app/search.py): kept in step with report writes
+# without storing its own copy of the text.
+#
+#   python -m pytest -q tests
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="esg-tests-")
+for name, value in {"LLM_CACHE_PATH": "llm_cache.db", "IMAGE_STORE_DIR": "images",
+                    "SCRAPER_METRICS_PATH": "scraper_metrics.json"}.items():
+    os.environ.setdefault(name, os.path.join(_scratch, value))
+
+from app import create_app
+from app.database import db
+from app.models import Report, utcnow
+from app.search import FTS_TABLE, search_reports
+
+CONTENT = "Heat pumps replaced gas boilers across the district heating network " * 20
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'data.db'}")
+    app = create_app()
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def titles(q):
+    return [hit["title"] for hit in search_reports(db.session, q)]
+
+
+def check_index():
+    # Compares the index with the text it was built from
+    db.session.execute(db.text(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('integrity-check', 1)"))
+
+
+def test_index_follows_report_writes(app):
+    report = Report(source="RSS Feed", url="https://example.com/heat", title="Utility electrifies heating",
+                    date_of_retrieval=utcnow(), content_type="Web Article", content=CONTENT)
+    db.session.add(report)
+    db.session.commit()
+    assert titles("boilers") == ["Utility electrifies heating"]
+    (hit,) = search_reports(db.session, "boilers")
+    assert "<mark>boilers</mark>" in hit["snippet"]
+
+    report.title = "City retires gas boilers"
+    report.content = "Solar canopies now cover the depot car parks " * 20
+    db.session.commit()
+    check_index()
+    assert titles("heating") == []
+    assert titles("solar canopies") == ["City retires gas boilers"]
+
+    db.session.delete(report)
+    db.session.commit()
+    check_index()
+    assert titles("solar") == []